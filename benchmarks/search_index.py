@@ -0,0 +1,104 @@
+"""
+Latency benchmark for the inline search index (shivu/modules/database/search_index.py).
+
+Builds the catalog snapshot and index from synthetic characters (no Mongo or
+Telegram needed) and reports build time plus uncached p50/p99 query latency
+for random substrings of names and anime titles.
+
+    python benchmarks/search_index.py [--characters 50000] [--queries 1000] [--seed 1]
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import logging
+import os
+import random
+import sys
+import time
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RARITIES = ['🟢 Common', '🟣 Rare', '🟡 Legendary', '💮 Special Edition', '💫 Neon']
+SYLLABLES = [a + b for a in 'bdfghkmnprstyz' for b in 'aeiou'] + ['shi', 'chi', 'tsu', 'ryu', 'kyo']
+
+
+def _load(name, relpath):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, relpath))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def _load_modules():
+    # The real shivu package connects to Mongo and Telegram on import
+    shivu = types.ModuleType('shivu')
+    shivu.collection = None
+    shivu.LOGGER = logging.getLogger('bench')
+    sys.modules['shivu'] = shivu
+    catalog = _load('shivu.modules.database.catalog', 'shivu/modules/database/catalog.py')
+    search_index = _load('shivu.modules.database.search_index', 'shivu/modules/database/search_index.py')
+    return catalog, search_index
+
+
+def _word(rng, syllables):
+    return ''.join(rng.choice(SYLLABLES) for _ in range(syllables)).capitalize()
+
+
+def _percentiles(latencies):
+    latencies = sorted(latencies)
+    p50 = latencies[len(latencies) // 2] * 1e3
+    p99 = latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)] * 1e3
+    return p50, p99
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--characters', type=int, default=50000)
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    catalog, search_index = _load_modules()
+    rng = random.Random(args.seed)
+
+    animes = [f"{_word(rng, 3)} {_word(rng, 2)}" for _ in range(max(args.characters // 16, 1))]
+    catalog._loaded = True
+    for i in range(args.characters):
+        catalog._store(str(i), {
+            'id': str(i),
+            'name': f"{_word(rng, 2)} {_word(rng, 3)}",
+            'anime': rng.choice(animes),
+            'rarity': rng.choice(RARITIES),
+        })
+
+    started = time.perf_counter()
+    asyncio.run(search_index.build_index())
+    print(f"characters: {args.characters}  build: {time.perf_counter() - started:.2f}s")
+
+    characters = catalog.get_all_characters()
+    queries = []
+    for _ in range(args.queries):
+        value = rng.choice(characters)[rng.choice(['name', 'anime', 'name'])].lower()
+        start = rng.randrange(len(value))
+        queries.append(value[start:start + rng.randint(1, 10)])
+
+    for label, subset in (('all queries', queries), ('3+ chars', [q for q in queries if len(q.strip()) >= 3])):
+        latencies = []
+        for query in subset:
+            search_index._results.clear()
+            started = time.perf_counter()
+            search_index.search_characters(query)
+            latencies.append(time.perf_counter() - started)
+        if latencies:
+            p50, p99 = _percentiles(latencies)
+            print(f"{label:>12}: n={len(latencies)}  p50 {p50:.2f}ms  p99 {p99:.2f}ms")
+
+    started = time.perf_counter()
+    search_index.search_characters(queries[-1])
+    print(f"{'cached hit':>12}: {(time.perf_counter() - started) * 1e3:.4f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,9 @@
 import importlib
 import time
 import random
-import asyncio
 import traceback
 from html import escape
+from cachetools import TTLCache
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
 from telegram.ext import CommandHandler, MessageHandler, filters, CallbackQueryHandler
 from telegram.error import BadRequest
@@ -11,25 +11,30 @@ from shivu import callback
 
 from shivu import db, shivuu, application, LOGGER
 from shivu.modules import ALL_MODULES
+from shivu.modules.database.active_spawns import save_spawn, mark_missed, forget_spawn, load_spawns
+from shivu.modules.database.catalog import (
+    ensure_catalog, load_catalog, get_rarity_pools, get_character, get_character_at, get_character_index,
+    get_catalog_version, rarity_emoji as get_rarity_emoji
+)
+from shivu.modules.database.chat_state import ChatStateStore
+from shivu.modules.database.file_ids import send_character_photo
+from shivu.modules.database.frequency import get_chat_message_frequency
+from shivu.modules.database.global_counts import start_global_counts, stop_global_counts
+from shivu.modules.database.propagation import start_propagation, stop_propagation
+from shivu.modules.database.grab_counters import record_grab, start_grab_flusher, stop_grab_flusher
+from shivu.modules.database.ownership import grant_character, drain_ownership_hooks
+from shivu.modules.database.spawn_sampler import pick_rarity
+from shivu.modules.database.timer_wheel import TimerWheel
 
 collection = db['anime_characters_lol']
 user_collection = db['user_collection_lmaoooo']
-user_totals_collection = db['user_totals_lmaoooo']
-group_user_totals_collection = db['group_user_totalsssssss']
-top_global_groups_collection = db['top_global_groups']
 
-DEFAULT_MESSAGE_FREQUENCY = 70
 DESPAWN_TIME = 180
+MISSED_MESSAGE_TIME = 10
 
-locks = {}
-message_counts = {}
-sent_characters = {}
-last_characters = {}
-first_correct_guesses = {}
-last_user = {}
-warned_users = {}
-spawn_messages = {}
-spawn_message_links = {}
+chat_states = ChatStateStore()
+warned_users = TTLCache(maxsize=50000, ttl=600)
+despawn_wheel = TimerWheel()
 
 # Import all modules
 for module_name in ALL_MODULES:
@@ -41,7 +46,7 @@ for module_name in ALL_MODULES:
 
 # Import spawn settings
 try:
-    from shivu.modules.rarity import spawn_settings_collection, group_rarity_collection, get_spawn_settings, get_group_exclusive
+    from shivu.modules.rarity import spawn_settings_collection, group_rarity_collection, get_spawn_settings, get_group_exclusive, get_blocked_rarities
     LOGGER.info("✅ Rarity system loaded")
 except Exception as e:
     LOGGER.error(f"Could not import rarity: {e}")
@@ -55,114 +60,109 @@ async def is_character_allowed(character, chat_id=None):
         if character.get('removed', False):
             return False
 
-        char_rarity = character.get('rarity', '🟢 Common')
-        rarity_emoji = char_rarity.split(' ')[0] if isinstance(char_rarity, str) and ' ' in char_rarity else char_rarity
+        if spawn_settings_collection is None:
+            return True
 
-        # Check group exclusivity
-        if group_rarity_collection is not None and chat_id:
-            try:
-                # Check if current group has this as exclusive - ALWAYS ALLOW
-                current_group_exclusive = await group_rarity_collection.find_one({
-                    'chat_id': chat_id,
-                    'rarity_emoji': rarity_emoji
-                })
-                
-                if current_group_exclusive:
-                    LOGGER.info(f"Chat {chat_id} allowing exclusive rarity {rarity_emoji}")
-                    return True
-                
-                # Check if this rarity is exclusive to ANOTHER group - BLOCK IT
-                other_group_exclusive = await group_rarity_collection.find_one({
-                    'rarity_emoji': rarity_emoji,
-                    'chat_id': {'$ne': chat_id}
-                })
-                
-                if other_group_exclusive:
-                    LOGGER.info(f"Chat {chat_id} blocking {rarity_emoji} (exclusive to {other_group_exclusive['chat_id']})")
-                    return False
-            except Exception as e:
-                LOGGER.error(f"Error checking group exclusivity: {e}")
-
-        # Check global settings for non-exclusive rarities
-        if spawn_settings_collection is not None:
-            try:
-                settings = await get_spawn_settings()
-                if settings and settings.get('rarities'):
-                    rarities = settings['rarities']
-                    if rarity_emoji in rarities:
-                        is_enabled = rarities[rarity_emoji].get('enabled', True)
-                        if not is_enabled:
-                            LOGGER.info(f"Blocking {rarity_emoji} - globally disabled")
-                        return is_enabled
-            except Exception as e:
-                LOGGER.error(f"Error checking global settings: {e}")
-
-        return True
+        blocked = await get_blocked_rarities(chat_id)
+        return get_rarity_emoji(character) not in blocked
     except Exception as e:
         LOGGER.error(f"Error in is_character_allowed: {e}")
         return True
 
 
-async def get_chat_message_frequency(chat_id):
-    """Get message frequency for chat"""
-    try:
-        chat_frequency = await user_totals_collection.find_one({'chat_id': chat_id})
-        if chat_frequency:
-            return chat_frequency.get('message_frequency', DEFAULT_MESSAGE_FREQUENCY)
-        await user_totals_collection.insert_one({'chat_id': chat_id, 'message_frequency': DEFAULT_MESSAGE_FREQUENCY})
-        return DEFAULT_MESSAGE_FREQUENCY
-    except:
-        return DEFAULT_MESSAGE_FREQUENCY
-
+def clear_spawn(chat_id, spawn):
+    """Drop the chat's spawn state if it still belongs to this spawn"""
+    state = chat_states.peek(chat_id)
+    if state is None or state.spawn is not spawn:
+        return
+    state.spawn = None
+    state.character = None
+    state.spawn_message_id = None
+    state.spawn_link = None
 
-async def update_grab_task(user_id: int):
-    """Update grab task for user"""
-    try:
-        user = await user_collection.find_one({'id': user_id})
-        if user and 'pass_data' in user:
-            await user_collection.update_one({'id': user_id}, {'$inc': {'pass_data.tasks.grabs': 1}})
-    except:
-        pass
 
-
-async def despawn_character(chat_id, message_id, character, context):
+async def despawn_character(chat_id, spawn):
     """Handle character despawn after timeout"""
     try:
-        await asyncio.sleep(DESPAWN_TIME)
-
-        if chat_id in first_correct_guesses:
-            last_characters.pop(chat_id, None)
-            spawn_messages.pop(chat_id, None)
-            spawn_message_links.pop(chat_id, None)
+        if spawn['grabbed']:
+            clear_spawn(chat_id, spawn)
+            await forget_spawn(chat_id, spawn['message_id'])
             return
 
         try:
-            await context.bot.delete_message(chat_id=chat_id, message_id=message_id)
+            await application.bot.delete_message(chat_id=chat_id, message_id=spawn['message_id'])
         except:
             pass
 
+        character = spawn['character']
+        if not character:
+            clear_spawn(chat_id, spawn)
+            await forget_spawn(chat_id, spawn['message_id'])
+            return
+
         rarity = character.get('rarity', '🟢 Common')
         rarity_emoji = rarity.split(' ')[0] if isinstance(rarity, str) and ' ' in rarity else '🟢'
 
-        missed_msg = await context.bot.send_photo(
+        missed_msg = await send_character_photo(
+            application.bot.send_photo,
+            character,
             chat_id=chat_id,
-            photo=character['img_url'],
             caption=f"⏰ ᴛɪᴍᴇ's ᴜᴘ!\n{rarity_emoji} ɴᴀᴍᴇ: <b>{character.get('name', 'Unknown')}</b>\n⚡ ᴀɴɪᴍᴇ: <b>{character.get('anime', 'Unknown')}</b>\n💔 ʙᴇᴛᴛᴇʀ ʟᴜᴄᴋ ɴᴇxᴛ ᴛɪᴍᴇ!",
             parse_mode='HTML'
         )
 
-        await asyncio.sleep(10)
+        despawn_wheel.schedule(
+            ('missed', chat_id, spawn['message_id']),
+            MISSED_MESSAGE_TIME,
+            remove_missed_message, chat_id, spawn, missed_msg.message_id
+        )
+        await mark_missed(chat_id, spawn['message_id'], missed_msg.message_id, time.time() + MISSED_MESSAGE_TIME)
+
+    except Exception as e:
+        LOGGER.error(f"Error in despawn: {e}")
+        clear_spawn(chat_id, spawn)
+        await forget_spawn(chat_id, spawn['message_id'])
+
+
+async def remove_missed_message(chat_id, spawn, missed_message_id):
+    """Delete the "time's up" message and forget the spawn"""
+    if missed_message_id:
         try:
-            await context.bot.delete_message(chat_id=chat_id, message_id=missed_msg.message_id)
+            await application.bot.delete_message(chat_id=chat_id, message_id=missed_message_id)
         except:
             pass
 
-        last_characters.pop(chat_id, None)
-        spawn_messages.pop(chat_id, None)
-        spawn_message_links.pop(chat_id, None)
+    clear_spawn(chat_id, spawn)
+    await forget_spawn(chat_id, spawn['message_id'])
 
-    except Exception as e:
-        LOGGER.error(f"Error in despawn: {e}")
+
+async def restore_spawns():
+    """Resume despawn timers for spawns that were live when the worker stopped"""
+    now = time.time()
+    docs = sorted(await load_spawns(), key=lambda d: d.get('due', 0))
+    for doc in docs:
+        chat_id = doc['chat_id']
+        message_id = doc['message_id']
+        delay = max(0, doc.get('due', now) - now)
+
+        if doc.get('phase') == 'missed':
+            spawn = {'message_id': message_id, 'character': None, 'grabbed': False}
+            despawn_wheel.schedule(('missed', chat_id, message_id), delay, remove_missed_message, chat_id, spawn, doc.get('missed_message_id'))
+            continue
+
+        character = get_character(doc.get('character_id'))
+        spawn = {'message_id': message_id, 'character': character, 'grabbed': False}
+        if character:
+            state = chat_states.get(chat_id)
+            state.spawn = spawn
+            state.character = character
+            state.grabbed_by = None
+            state.spawn_message_id = message_id
+            state.spawn_link = doc.get('link')
+        despawn_wheel.schedule(('despawn', chat_id, message_id), delay, despawn_character, chat_id, spawn)
+
+    if docs:
+        LOGGER.info(f"Restored {len(docs)} pending spawn timers")
 
 
 async def message_counter(update: Update, context):
@@ -171,19 +171,17 @@ async def message_counter(update: Update, context):
         if update.effective_chat.type not in ['group', 'supergroup'] or not update.message or not update.message.text or update.message.text.startswith('/'):
             return
 
-        chat_id = str(update.effective_chat.id)
+        chat_id = update.effective_chat.id
         user_id = update.effective_user.id
+        state = chat_states.get(chat_id)
 
-        if chat_id not in locks:
-            locks[chat_id] = asyncio.Lock()
-
-        async with locks[chat_id]:
-            message_frequency = await get_chat_message_frequency(chat_id)
+        async with state.lock:
+            message_frequency = await get_chat_message_frequency(str(chat_id))
 
-            if chat_id in last_user and last_user[chat_id]['user_id'] == user_id:
-                last_user[chat_id]['count'] += 1
-                if last_user[chat_id]['count'] >= 10:
-                    if user_id in warned_users and time.time() - warned_users[user_id] < 600:
+            if state.last_user_id == user_id:
+                state.last_user_count += 1
+                if state.last_user_count >= 10:
+                    if user_id in warned_users:
                         return
                     try:
                         await update.message.reply_html(f"<b>ᴅᴏɴ'ᴛ sᴘᴀᴍ</b> {escape(update.effective_user.first_name)}...\n<b>ʏᴏᴜʀ ᴍᴇssᴀɢᴇs ᴡɪʟʟ ʙᴇ ɪɢɴᴏʀᴇᴅ ғᴏʀ 10 ᴍɪɴᴜᴛᴇs...!!</b>")
@@ -192,40 +190,46 @@ async def message_counter(update: Update, context):
                     warned_users[user_id] = time.time()
                     return
             else:
-                last_user[chat_id] = {'user_id': user_id, 'count': 1}
+                state.last_user_id = user_id
+                state.last_user_count = 1
 
-            message_counts[chat_id] = message_counts.get(chat_id, 0) + 1
+            state.message_count += 1
 
-            if message_counts[chat_id] >= message_frequency:
-                await send_image(update, context)
-                message_counts[chat_id] = 0
+            if state.message_count >= message_frequency:
+                await send_image(update, context, state)
+                state.message_count = 0
     except Exception as e:
         LOGGER.error(f"Error in message_counter: {e}")
 
 
-async def send_image(update: Update, context):
+async def send_image(update: Update, context, state=None):
     """Enhanced spawn - Group gets exclusive rarity + all global rarities"""
     chat_id = update.effective_chat.id
+    if state is None:
+        state = chat_states.get(chat_id)
     try:
-        all_characters = list(await collection.find({}).to_list(length=None))
-        if not all_characters:
+        await ensure_catalog()
+        pools = get_rarity_pools()
+        if not pools:
             LOGGER.warning("No characters in database")
             return
 
-        if chat_id not in sent_characters:
-            sent_characters[chat_id] = []
-
-        if len(sent_characters[chat_id]) >= len(all_characters):
-            sent_characters[chat_id] = []
-
-        available = [c for c in all_characters if 'id' in c and c.get('id') not in sent_characters[chat_id]]
-        if not available:
-            available = all_characters
-            sent_characters[chat_id] = []
-
         # Filter by allowed characters
-        allowed = [char for char in available if await is_character_allowed(char, chat_id)]
-        if not allowed:
+        blocked = set()
+        if spawn_settings_collection is not None:
+            try:
+                blocked = await get_blocked_rarities(chat_id)
+            except Exception as e:
+                LOGGER.error(f"Error getting blocked rarities: {e}")
+
+        # Only pools that still have characters this chat has not seen
+        tracker = state.sent
+        tracker.sync(pools, get_catalog_version())
+        rarity_pools = {emoji: pool for emoji, pool in pools.items() if emoji not in blocked and tracker.unsent(emoji, pool) > 0}
+        if not rarity_pools:
+            tracker.clear()
+            rarity_pools = {emoji: pool for emoji, pool in pools.items() if emoji not in blocked}
+        if not rarity_pools:
             LOGGER.warning(f"No allowed characters for chat {chat_id}")
             return
 
@@ -242,98 +246,57 @@ async def send_image(update: Update, context):
             settings = await get_spawn_settings()
             global_rarities = settings.get('rarities', {}) if settings else {}
 
-            # Build rarity pools
-            rarity_pools = {}
-            
-            for char in allowed:
-                char_rarity = char.get('rarity', '🟢 Common')
-                emoji = char_rarity.split(' ')[0] if isinstance(char_rarity, str) and ' ' in char_rarity else char_rarity
-                
-                if emoji not in rarity_pools:
-                    rarity_pools[emoji] = []
-                rarity_pools[emoji].append(char)
-
-            # Build weighted selection
-            weighted_choices = []
-
-            # Add exclusive rarity if group has one
-            if group_setting:
-                exclusive_emoji = group_setting['rarity_emoji']
-                exclusive_chance = group_setting.get('chance', 10.0)
-                
-                if exclusive_emoji in rarity_pools and rarity_pools[exclusive_emoji]:
-                    weighted_choices.append({
-                        'emoji': exclusive_emoji,
-                        'chars': rarity_pools[exclusive_emoji],
-                        'chance': exclusive_chance,
-                        'is_exclusive': True
-                    })
-                    LOGGER.info(f"Chat {chat_id} has exclusive {exclusive_emoji} ({exclusive_chance}%)")
-
-            # Add all global enabled rarities (excluding exclusive if already added)
-            for emoji, rarity_data in global_rarities.items():
-                if not rarity_data.get('enabled', True):
-                    continue
-                    
-                # Skip if this is the exclusive rarity (already added)
-                if group_setting and emoji == group_setting['rarity_emoji']:
-                    continue
-                
-                if emoji in rarity_pools and rarity_pools[emoji]:
-                    weighted_choices.append({
-                        'emoji': emoji,
-                        'chars': rarity_pools[emoji],
-                        'chance': rarity_data.get('chance', 5.0),
-                        'is_exclusive': False
-                    })
-
-            # Select character using weighted random
-            if weighted_choices:
-                total_chance = sum(choice['chance'] for choice in weighted_choices)
-                rand = random.uniform(0, total_chance)
-                
-                cumulative = 0
-                for choice in weighted_choices:
-                    cumulative += choice['chance']
-                    if rand <= cumulative:
-                        character = random.choice(choice['chars'])
-                        selected_rarity = choice['emoji']
-                        exclusive_tag = " [EXCLUSIVE]" if choice['is_exclusive'] else ""
-                        LOGGER.info(f"Chat {chat_id} spawned {selected_rarity}{exclusive_tag} (chance: {choice['chance']:.2f}%, roll: {rand:.2f}/{total_chance:.2f})")
-                        break
+            # Pick a rarity from the chat's cached alias table
+            choice = pick_rarity(chat_id, rarity_pools, global_rarities, group_setting)
+            if choice:
+                selected_rarity, chance, is_exclusive = choice
+                idx = tracker.draw(rarity_pools[selected_rarity])
+                character = get_character_at(idx) if idx is not None else None
+                exclusive_tag = " [EXCLUSIVE]" if is_exclusive else ""
+                LOGGER.info(f"Chat {chat_id} spawned {selected_rarity}{exclusive_tag} (chance: {chance:.2f}%)")
 
         except Exception as e:
             LOGGER.error(f"Error in weighted selection: {e}\n{traceback.format_exc()}")
 
-        # Fallback to random if selection failed
+        # Fallback to a uniform pick over every unsent allowed character
         if not character:
-            character = random.choice(allowed)
+            emojis = list(rarity_pools)
+            weights = [tracker.unsent(emoji, rarity_pools[emoji]) for emoji in emojis]
+            selected_rarity = random.choices(emojis, weights=weights)[0] if sum(weights) > 0 else random.choice(emojis)
+            character = get_character_at(tracker.draw(rarity_pools[selected_rarity]))
             LOGGER.warning(f"Chat {chat_id} used fallback random selection")
 
-        sent_characters[chat_id].append(character['id'])
-        last_characters[chat_id] = character
-        first_correct_guesses.pop(chat_id, None)
+        tracker.add(get_character_index(character['id']), selected_rarity)
 
         rarity = character.get('rarity', 'Common')
         rarity_emoji = rarity.split(' ')[0] if isinstance(rarity, str) and ' ' in rarity else '🟢'
 
-        spawn_msg = await context.bot.send_photo(
+        spawn_msg = await send_character_photo(
+            context.bot.send_photo,
+            character,
             chat_id=chat_id,
-            photo=character['img_url'],
             caption=f"{rarity_emoji} ʟᴏᴏᴋ ᴀ ᴡᴀɪғᴜ ʜᴀs sᴘᴀᴡɴᴇᴅ!!\nᴍᴀᴋᴇ ʜᴇʀ ʏᴏᴜʀ's ʙʏ /grab ᴡᴀɪғᴜ ɴᴀᴍᴇ\n⏰ {DESPAWN_TIME // 60} ᴍɪɴᴜᴛᴇs ᴛᴏ ɢʀᴀʙ!",
             parse_mode=None
         )
 
-        spawn_messages[chat_id] = spawn_msg.message_id
-
         chat_username = update.effective_chat.username
         if chat_username:
-            spawn_message_links[chat_id] = f"https://t.me/{chat_username}/{spawn_msg.message_id}"
+            spawn_link = f"https://t.me/{chat_username}/{spawn_msg.message_id}"
         else:
             chat_id_str = str(chat_id).replace('-100', '')
-            spawn_message_links[chat_id] = f"https://t.me/c/{chat_id_str}/{spawn_msg.message_id}"
-
-        asyncio.create_task(despawn_character(chat_id, spawn_msg.message_id, character, context))
+            spawn_link = f"https://t.me/c/{chat_id_str}/{spawn_msg.message_id}"
+
+        # Persist, then swap the whole spawn in: a despawn timer firing during
+        # the awaits must not clear a character its spawn does not own, and a
+        # grab can only forget the spawn's document after it was written
+        await save_spawn(chat_id, spawn_msg.message_id, character['id'], spawn_link, time.time() + DESPAWN_TIME)
+        spawn = {'message_id': spawn_msg.message_id, 'character': character, 'grabbed': False}
+        state.spawn = spawn
+        state.character = character
+        state.grabbed_by = None
+        state.spawn_message_id = spawn_msg.message_id
+        state.spawn_link = spawn_link
+        despawn_wheel.schedule(('despawn', chat_id, spawn_msg.message_id), DESPAWN_TIME, despawn_character, chat_id, spawn)
 
     except Exception as e:
         LOGGER.error(f"Error in send_image: {e}\n{traceback.format_exc()}")
@@ -345,10 +308,11 @@ async def guess(update: Update, context):
     user_id = update.effective_user.id
 
     try:
-        if chat_id not in last_characters:
+        state = chat_states.peek(chat_id)
+        if state is None or state.character is None:
             return
 
-        if chat_id in first_correct_guesses:
+        if state.grabbed_by is not None:
             await update.message.reply_html('<b>🚫 ᴡᴀɪғᴜ ᴀʟʀᴇᴀᴅʏ ɢʀᴀʙʙᴇᴅ!</b>')
             return
 
@@ -362,7 +326,8 @@ async def guess(update: Update, context):
             await update.message.reply_html("<b>ɪɴᴠᴀʟɪᴅ ᴄʜᴀʀᴀᴄᴛᴇʀs!❌</b>")
             return
 
-        character_name = last_characters[chat_id].get('name', '').lower()
+        character = state.character
+        character_name = character.get('name', '').lower()
         name_parts = character_name.split()
 
         is_correct = (sorted(name_parts) == sorted(guess_text.split()) or
@@ -370,60 +335,35 @@ async def guess(update: Update, context):
                      guess_text == character_name)
 
         if is_correct:
-            first_correct_guesses[chat_id] = user_id
+            state.grabbed_by = user_id
 
-            if chat_id in spawn_messages:
+            spawn = state.spawn
+            if spawn:
+                spawn['grabbed'] = True
+                await forget_spawn(chat_id, spawn['message_id'])
+
+            if state.spawn_message_id is not None:
                 try:
-                    await context.bot.delete_message(chat_id=chat_id, message_id=spawn_messages[chat_id])
+                    await context.bot.delete_message(chat_id=chat_id, message_id=state.spawn_message_id)
                 except:
                     pass
-                spawn_messages.pop(chat_id, None)
-
-            user = await user_collection.find_one({'id': user_id})
-            update_fields = {}
-            if hasattr(update.effective_user, 'username') and update.effective_user.username:
-                if not user or update.effective_user.username != user.get('username'):
-                    update_fields['username'] = update.effective_user.username
-            if not user or update.effective_user.first_name != user.get('first_name'):
-                update_fields['first_name'] = update.effective_user.first_name
-
-            if user:
-                if update_fields:
-                    await user_collection.update_one({'id': user_id}, {'$set': update_fields})
-                await user_collection.update_one({'id': user_id}, {'$push': {'characters': last_characters[chat_id]}})
-            else:
-                await user_collection.insert_one({
-                    'id': user_id,
-                    'username': getattr(update.effective_user, 'username', None),
-                    'first_name': update.effective_user.first_name,
-                    'characters': [last_characters[chat_id]],
-                })
-
-            await update_grab_task(user_id)
-
-            group_user_total = await group_user_totals_collection.find_one({'user_id': user_id, 'group_id': chat_id})
-            if group_user_total:
-                if update_fields:
-                    await group_user_totals_collection.update_one({'user_id': user_id, 'group_id': chat_id}, {'$set': update_fields})
-                await group_user_totals_collection.update_one({'user_id': user_id, 'group_id': chat_id}, {'$inc': {'count': 1}})
-            else:
-                await group_user_totals_collection.insert_one({
-                    'user_id': user_id,
-                    'group_id': chat_id,
-                    'username': getattr(update.effective_user, 'username', None),
-                    'first_name': update.effective_user.first_name,
-                    'count': 1,
-                })
-
-            group_info = await top_global_groups_collection.find_one({'group_id': chat_id})
-            if group_info:
-                if update.effective_chat.title != group_info.get('group_name'):
-                    await top_global_groups_collection.update_one({'group_id': chat_id}, {'$set': {'group_name': update.effective_chat.title}})
-                await top_global_groups_collection.update_one({'group_id': chat_id}, {'$inc': {'count': 1}})
-            else:
-                await top_global_groups_collection.insert_one({'group_id': chat_id, 'group_name': update.effective_chat.title, 'count': 1})
+                state.spawn_message_id = None
+
+            await grant_character(
+                user_id,
+                character,
+                username=getattr(update.effective_user, 'username', None),
+                first_name=update.effective_user.first_name
+            )
+
+            record_grab(
+                user_id,
+                chat_id,
+                getattr(update.effective_user, 'username', None),
+                update.effective_user.first_name,
+                update.effective_chat.title
+            )
 
-            character = last_characters[chat_id]
             keyboard = [[InlineKeyboardButton("🪼 ʜᴀʀᴇᴍ", switch_inline_query_current_chat=f"collection.{user_id}")]]
 
             rarity = character.get('rarity', '🟢 Common')
@@ -440,11 +380,11 @@ async def guess(update: Update, context):
                 reply_markup=InlineKeyboardMarkup(keyboard)
             )
 
-            spawn_message_links.pop(chat_id, None)
+            state.spawn_link = None
         else:
             keyboard = []
-            if chat_id in spawn_message_links:
-                keyboard.append([InlineKeyboardButton("📍 ᴠɪᴇᴡ sᴘᴀᴡɴ", url=spawn_message_links[chat_id])])
+            if state.spawn_link:
+                keyboard.append([InlineKeyboardButton("📍 ᴠɪᴇᴡ sᴘᴀᴡɴ", url=state.spawn_link)])
 
             await update.message.reply_html(
                 '<b>ᴡʀᴏɴɢ ɴᴀᴍᴇ!❌</b>',
@@ -454,7 +394,35 @@ async def guess(update: Update, context):
         LOGGER.error(f"Error in guess: {e}\n{traceback.format_exc()}")
 
 
+async def on_startup(application):
+    """Warm in-memory state before polling starts"""
+    try:
+        await load_catalog()
+    except Exception as e:
+        LOGGER.error(f"Error loading catalog snapshot: {e}")
+    start_grab_flusher()
+    start_global_counts()
+    start_propagation()
+    despawn_wheel.start()
+    try:
+        await restore_spawns()
+    except Exception as e:
+        LOGGER.error(f"Error restoring spawns: {e}")
+
+
+async def on_shutdown(application):
+    """Flush buffered writes before the process exits"""
+    LOGGER.info(f"Chat state store: {chat_states.stats()}")
+    despawn_wheel.stop()
+    stop_global_counts()
+    stop_propagation()
+    await stop_grab_flusher()
+    await drain_ownership_hooks()
+
+
 def main():
+    application.post_init = on_startup
+    application.post_shutdown = on_shutdown
     application.add_handler(CommandHandler(["grab", "g"], guess, block=False))
     application.add_handler(MessageHandler(filters.ALL, message_counter, block=False))
 
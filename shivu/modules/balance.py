@@ -5,6 +5,8 @@ from datetime import datetime, timedelta
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
 from telegram.ext import CommandHandler, CallbackQueryHandler, CallbackContext
 from shivu import application, user_collection, collection
+from shivu.modules.database.ownership import record_replace
+from shivu.modules.database.users import fetch_user
 
 pay_cooldown = {}
 pending_payments = {}
@@ -27,7 +29,7 @@ def fmt_time(s):
     return f"{h}ʜ {m}ᴍ {s}ꜱ" if h else f"{m}ᴍ {s}ꜱ"
 
 async def get_user(uid):
-    return await user_collection.find_one({'id': uid})
+    return await fetch_user(uid, 'wallet')
 
 async def init_user(uid):
     await user_collection.insert_one({
@@ -98,6 +100,7 @@ async def check_loans():
                                 seized.append(f"👤 {cname} (ɪᴅ: {cid})")
                                 chars.remove(cid)
                             await user_collection.update_one({'id': uid}, {'$set': {'characters': chars, 'loan_amount': 0, 'loan_due_date': None}})
+                            await record_replace(uid, chars)
                         else:
                             await user_collection.update_one({'id': uid}, {'$set': {'loan_amount': 0, 'loan_due_date': None}, '$inc': {'permanent_debt': debt}})
                             seized.append(f"⚠️ ᴀᴅᴅᴇᴅ {debt} ᴛᴏ ᴘᴇʀᴍᴀɴᴇɴᴛ ᴅᴇʙᴛ")
@@ -2,6 +2,7 @@ from pymongo import ReturnDocument
 from telegram import Update
 from telegram.ext import CommandHandler, CallbackContext
 from shivu import application, OWNER_ID, user_totals_collection
+from shivu.modules.database.frequency import set_cached_frequency
 
 async def change_time(update: Update, context: CallbackContext) -> None:
     user = update.effective_user
@@ -33,6 +34,7 @@ async def change_time(update: Update, context: CallbackContext) -> None:
             upsert=True,
             return_document=ReturnDocument.AFTER
         )
+        set_cached_frequency(str(chat.id), new_frequency)
 
         await update.message.reply_text(f'Successfully changed slave appearance frequency to every {new_frequency} messages.')
     except Exception as e:
@@ -68,6 +70,7 @@ async def change_time_sudo(update: Update, context: CallbackContext) -> None:
             upsert=True,
             return_document=ReturnDocument.AFTER
         )
+        set_cached_frequency(str(update.effective_chat.id), new_frequency)
 
         await update.message.reply_text(f'Successfully changed slave appearance frequency to every {new_frequency} messages.')
     except Exception as e:
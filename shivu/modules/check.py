@@ -1,6 +1,5 @@
 import urllib.request
 from html import escape
-from cachetools import TTLCache
 from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.ext import CommandHandler, CallbackContext, CallbackQueryHandler
 from pyrogram import filters
@@ -8,15 +7,16 @@ from pyrogram import types as t
 
 from shivu import application, sudo_users, db, CHARA_CHANNEL_ID
 from shivu import shivuu as bot
+from shivu.modules.database.catalog import ensure_catalog, get_character
+from shivu.modules.database.file_ids import send_character_photo
+from shivu.modules.database.global_counts import get_owner_count, get_copy_count
+from shivu.modules.database.search_index import search_anime, search_names
+from shivu.modules.database.top_owners import get_top_owners
 
 # Database collections
 collection = db['anime_characters_lol']
 user_collection = db['user_collection_lmaoooo']
 
-# Cache for frequently accessed characters
-character_cache = TTLCache(maxsize=1000, ttl=300)
-anime_cache = TTLCache(maxsize=500, ttl=600)
-
 OWNER_ID = 8420981179
 
 # ==================== UTILITY FUNCTIONS ====================
@@ -82,15 +82,10 @@ def get_rarity_color(rarity):
 
 
 async def get_character_by_id(character_id):
-    """Get character with caching"""
-    if character_id in character_cache:
-        return character_cache[character_id]
-    
+    """Get character from the catalog snapshot"""
     try:
-        character = await collection.find_one({'id': character_id})
-        if character:
-            character_cache[character_id] = character
-        return character
+        await ensure_catalog()
+        return get_character(character_id)
     except Exception as e:
         print(f"Error getting character: {e}")
         return None
@@ -99,41 +94,25 @@ async def get_character_by_id(character_id):
 async def get_global_count(character_id):
     """Get how many times character is grabbed globally"""
     try:
-        count = await user_collection.count_documents({'characters.id': character_id})
-        return count
+        return await get_owner_count(character_id)
     except Exception as e:
         print(f"Error getting global count: {e}")
         return 0
 
 
 async def get_users_by_character(character_id):
-    """Get all users who own a character"""
+    """Get the top owners of a character"""
     try:
-        cursor = user_collection.find(
-            {'characters.id': character_id},
+        owners = await get_top_owners(character_id)
+        return [
             {
-                '_id': 0,
-                'id': 1,
-                'first_name': 1,
-                'username': 1,
-                'characters': 1
+                'id': user.get('id'),
+                'first_name': user.get('first_name') or 'Unknown',
+                'username': user.get('username'),
+                'count': user.get('count', 0)
             }
-        )
-        users = await cursor.to_list(length=None)
-        
-        # Count how many times each user has this character
-        user_data = []
-        for user in users:
-            count = sum(1 for c in user.get('characters', []) if c.get('id') == character_id)
-            if count > 0:
-                user_data.append({
-                    'id': user.get('id'),
-                    'first_name': user.get('first_name', 'Unknown'),
-                    'username': user.get('username'),
-                    'count': count
-                })
-        
-        return user_data
+            for user in owners
+        ]
     except Exception as e:
         print(f"Failed to get users by character: {e}")
         return []
@@ -263,9 +242,10 @@ async def check_character(update: Update, context: CallbackContext) -> None:
             ]
         ]
         
-        await context.bot.send_photo(
+        await send_character_photo(
+            context.bot.send_photo,
+            character,
             chat_id=update.effective_chat.id,
-            photo=character['img_url'],
             caption=caption,
             parse_mode='HTML',
             reply_markup=InlineKeyboardMarkup(keyboard)
@@ -295,9 +275,8 @@ async def find_character(update: Update, context: CallbackContext) -> None:
         char_name = ' '.join(context.args)
         
         # Search characters
-        characters = await collection.find({
-            'name': {'$regex': char_name, '$options': 'i'}
-        }).limit(10).to_list(length=10)
+        await ensure_catalog()
+        characters = search_names(char_name, limit=10)
         
         if not characters:
             await update.message.reply_text(
@@ -345,15 +324,8 @@ async def find_anime(_, message: t.Message):
 
         anime_name = " ".join(message.command[1:])
         
-        # Check cache
-        cache_key = f"anime_{anime_name.lower()}"
-        if cache_key in anime_cache:
-            characters = anime_cache[cache_key]
-        else:
-            characters = await collection.find({
-                'anime': {'$regex': anime_name, '$options': 'i'}
-            }).to_list(length=None)
-            anime_cache[cache_key] = characters
+        await ensure_catalog()
+        characters = search_anime(anime_name)
 
         if not characters:
             return await message.reply_text(
@@ -431,17 +403,15 @@ async def find_users_with_character(_, message: t.Message):
             )
             return
         
-        # Sort by count
-        users.sort(key=lambda x: x['count'], reverse=True)
-        
         global_count = await get_global_count(character_id)
         
         # Format with image
         caption = format_character_card(character, global_count, show_owners=True, owners_list=users)
         
-        await bot.send_photo(
+        await send_character_photo(
+            bot.send_photo,
+            character,
             chat_id=message.chat.id,
-            photo=character['img_url'],
             caption=caption,
             reply_to_message_id=message.id
         )
@@ -479,9 +449,6 @@ async def handle_show_owners(update: Update, context: CallbackContext) -> None:
             )
             return
         
-        # Sort by count
-        users.sort(key=lambda x: x['count'], reverse=True)
-        
         global_count = await get_global_count(character_id)
         
         # Format caption with owners
@@ -573,9 +540,8 @@ async def handle_char_stats(update: Update, context: CallbackContext) -> None:
             await query.answer(to_small_caps("character not found"), show_alert=True)
             return
         
-        global_count = await get_global_count(character_id)
-        users = await get_users_by_character(character_id)
-        unique_owners = len(users)
+        global_count = await get_copy_count(character_id)
+        unique_owners = await get_owner_count(character_id)
         
         stats = (
             f"📊 {to_small_caps('statistics')}\n\n"
@@ -0,0 +1,46 @@
+"""
+Persistence for spawns that are still on screen.
+One small document per spawn (ids, link, due time and phase) lets a restarted
+worker resume pending despawns instead of leaving orphaned spawn photos.
+"""
+
+from shivu import db, LOGGER
+
+active_spawns_collection = db['active_spawns']
+
+
+async def save_spawn(chat_id, message_id, character_id, link, due):
+    try:
+        await active_spawns_collection.update_one(
+            {'chat_id': chat_id, 'message_id': message_id},
+            {'$set': {'character_id': character_id, 'link': link, 'due': due, 'phase': 'spawn'}},
+            upsert=True
+        )
+    except Exception as e:
+        LOGGER.error(f"Error saving active spawn: {e}")
+
+
+async def mark_missed(chat_id, message_id, missed_message_id, due):
+    """Spawn timed out; only the 'time's up' message is left to clean up"""
+    try:
+        await active_spawns_collection.update_one(
+            {'chat_id': chat_id, 'message_id': message_id},
+            {'$set': {'phase': 'missed', 'missed_message_id': missed_message_id, 'due': due}}
+        )
+    except Exception as e:
+        LOGGER.error(f"Error updating active spawn: {e}")
+
+
+async def forget_spawn(chat_id, message_id):
+    try:
+        await active_spawns_collection.delete_one({'chat_id': chat_id, 'message_id': message_id})
+    except Exception as e:
+        LOGGER.error(f"Error removing active spawn: {e}")
+
+
+async def load_spawns():
+    try:
+        return await active_spawns_collection.find({}, {'_id': 0}).to_list(length=None)
+    except Exception as e:
+        LOGGER.error(f"Error loading active spawns: {e}")
+        return []
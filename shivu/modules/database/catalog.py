@@ -0,0 +1,215 @@
+"""
+In-memory snapshot of the character catalog (anime_characters_lol).
+Loaded once at startup and refreshed per character whenever the catalog is
+written, so hot paths like spawning never read the whole collection.
+
+Every character id also gets a dense integer index that stays stable for the
+lifetime of the process (deleted characters leave a hole), so per-chat state
+can be kept as bitsets over the catalog. Derived indexes can subscribe with
+add_catalog_listener to hear about each stored or dropped character,
+add_edit_listener to hear about changes to characters already known, and
+add_load_listener to hear when a full snapshot has been (re)loaded.
+"""
+
+import asyncio
+
+from shivu import collection, LOGGER
+
+_characters = {}
+_index = {}
+_by_index = []
+_ordered = []
+_pools = {}
+_pools_version = -1
+_anime_members = {}
+_anime_totals = {}
+_anime_version = -1
+_ordered_version = -1
+_version = 0
+_loaded = False
+_load_lock = asyncio.Lock()
+_listeners = []
+_edit_listeners = []
+_load_listeners = []
+
+
+def rarity_emoji(character):
+    """Leading emoji of a character's rarity string"""
+    char_rarity = character.get('rarity', '🟢 Common')
+    return char_rarity.split(' ')[0] if isinstance(char_rarity, str) and ' ' in char_rarity else char_rarity
+
+
+def _store(char_id, char):
+    idx = _index.get(char_id)
+    if idx is None:
+        idx = len(_by_index)
+        _index[char_id] = idx
+        _by_index.append(None)
+    _by_index[idx] = char
+    old = _characters.get(char_id)
+    _characters[char_id] = char
+    _notify(idx, char)
+    if old is not None and old != char:
+        _notify_edit(char_id, old, char)
+
+
+def _drop(char_id):
+    idx = _index.get(char_id)
+    if idx is not None:
+        _by_index[idx] = None
+        _notify(idx, None)
+    return _characters.pop(char_id, None)
+
+
+def _notify(idx, char):
+    for listener in _listeners:
+        try:
+            listener(idx, char)
+        except Exception as e:
+            LOGGER.error(f"Catalog listener failed for index {idx}: {e}")
+
+
+def add_catalog_listener(listener):
+    """Call listener(idx, char) whenever a character is stored (char=None when dropped)"""
+    _listeners.append(listener)
+
+
+def _notify_edit(char_id, old, new):
+    for listener in _edit_listeners:
+        try:
+            listener(char_id, old, new)
+        except Exception as e:
+            LOGGER.error(f"Catalog edit listener failed for {char_id}: {e}")
+
+
+def add_edit_listener(listener):
+    """Call listener(char_id, old, new) when a known character's document changes"""
+    _edit_listeners.append(listener)
+
+
+def add_load_listener(listener):
+    """Call listener() after every full snapshot load, whichever path triggered it"""
+    _load_listeners.append(listener)
+
+
+def _bump():
+    global _version
+    _version += 1
+
+
+def get_catalog_version():
+    """Monotonic counter, incremented on every catalog change"""
+    return _version
+
+
+def is_catalog_loaded():
+    return _loaded
+
+
+async def load_catalog():
+    """Load the full catalog into memory (replaces any previous snapshot)"""
+    global _loaded
+    async with _load_lock:
+        characters = {}
+        async for char in collection.find({}, {'_id': 0}):
+            if 'id' in char:
+                characters[char['id']] = char
+        for char_id in list(_characters):
+            if char_id not in characters:
+                _drop(char_id)
+        for char_id, char in characters.items():
+            _store(char_id, char)
+        _loaded = True
+        _bump()
+        LOGGER.info(f"Catalog snapshot loaded: {len(_characters)} characters")
+    for listener in _load_listeners:
+        try:
+            listener()
+        except Exception as e:
+            LOGGER.error(f"Catalog load listener failed: {e}")
+
+
+async def ensure_catalog():
+    """Load the snapshot if it has not been loaded yet"""
+    if not _loaded:
+        await load_catalog()
+
+
+async def refresh_character(char_id):
+    """Re-read a single character after it was inserted or updated"""
+    if not _loaded:
+        return
+    try:
+        char = await collection.find_one({'id': char_id}, {'_id': 0})
+        if char:
+            _store(char_id, char)
+        else:
+            _drop(char_id)
+        _bump()
+    except Exception as e:
+        LOGGER.error(f"Error refreshing catalog character {char_id}: {e}")
+
+
+def discard_character(char_id):
+    """Drop a deleted character from the snapshot"""
+    if _drop(char_id) is not None:
+        _bump()
+
+
+def get_character(char_id):
+    return _characters.get(char_id)
+
+
+def get_all_characters():
+    """All catalog characters as a list; rebuilt only when the catalog changes"""
+    global _ordered, _ordered_version
+    if _ordered_version != _version:
+        _ordered = list(_characters.values())
+        _ordered_version = _version
+    return _ordered
+
+
+def get_character_index(char_id):
+    return _index.get(char_id)
+
+
+def get_character_at(idx):
+    """Character stored at a dense index, or None if it was deleted"""
+    return _by_index[idx] if 0 <= idx < len(_by_index) else None
+
+
+def get_rarity_pools():
+    """rarity emoji -> indices of spawnable (not removed) characters"""
+    global _pools, _pools_version
+    if _pools_version != _version:
+        pools = {}
+        for char_id, char in _characters.items():
+            if char.get('removed', False):
+                continue
+            pools.setdefault(rarity_emoji(char), []).append(_index[char_id])
+        _pools = pools
+        _pools_version = _version
+    return _pools
+
+
+def _group_by_anime():
+    global _anime_members, _anime_totals, _anime_version
+    if _anime_version != _version:
+        members = {}
+        for char in _characters.values():
+            members.setdefault(char.get('anime'), []).append(char)
+        _anime_members = members
+        _anime_totals = {anime: len(chars) for anime, chars in members.items()}
+        _anime_version = _version
+
+
+def get_anime_totals():
+    """anime -> number of catalog characters; rebuilt only when the catalog changes"""
+    _group_by_anime()
+    return _anime_totals
+
+
+def get_anime_members():
+    """anime -> its catalog characters in catalog order; rebuilt only when the catalog changes"""
+    _group_by_anime()
+    return _anime_members
@@ -0,0 +1,87 @@
+"""
+Per-chat state for the spawn engine.
+Everything the bot remembers about a group (message counter, spam tracker,
+sent characters, the live spawn) lives in one ChatState, and the store keeps
+at most max_chats of them, evicting the least recently active ones and any
+chat idle for longer than idle_seconds. Chats with a held lock or a live
+spawn are never evicted.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+
+from shivu.modules.database.sent_tracker import SentTracker
+
+MAX_CHATS = 20000
+IDLE_SECONDS = 6 * 60 * 60
+
+
+class ChatState:
+    __slots__ = (
+        'lock', 'message_count', 'last_user_id', 'last_user_count', 'sent',
+        'character', 'grabbed_by', 'spawn', 'spawn_message_id', 'spawn_link', 'last_seen',
+    )
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.message_count = 0
+        self.last_user_id = None
+        self.last_user_count = 0
+        self.sent = SentTracker()
+        self.character = None
+        self.grabbed_by = None
+        self.spawn = None
+        self.spawn_message_id = None
+        self.spawn_link = None
+        self.last_seen = time.monotonic()
+
+    def is_pinned(self):
+        """A chat in the middle of counting or with a live spawn must stay resident"""
+        return self.lock.locked() or self.spawn is not None or self.character is not None
+
+
+class ChatStateStore:
+    def __init__(self, max_chats=MAX_CHATS, idle_seconds=IDLE_SECONDS):
+        self.max_chats = max_chats
+        self.idle_seconds = idle_seconds
+        self.evictions = 0
+        self._states = OrderedDict()
+
+    def __len__(self):
+        return len(self._states)
+
+    def get(self, chat_id):
+        """State for chat_id, created on first use; marks the chat as active"""
+        state = self._states.get(chat_id)
+        if state is None:
+            state = ChatState()
+            self._states[chat_id] = state
+            self._evict()
+        else:
+            self._states.move_to_end(chat_id)
+        state.last_seen = time.monotonic()
+        return state
+
+    def peek(self, chat_id):
+        """State for chat_id if resident, without creating or touching it"""
+        return self._states.get(chat_id)
+
+    def _evict(self):
+        now = time.monotonic()
+        skipped = 0
+        while skipped < len(self._states):
+            chat_id, state = next(iter(self._states.items()))
+            over_limit = len(self._states) > self.max_chats
+            idle = now - state.last_seen > self.idle_seconds
+            if not over_limit and not idle:
+                break
+            if state.is_pinned():
+                self._states.move_to_end(chat_id)
+                skipped += 1
+                continue
+            del self._states[chat_id]
+            self.evictions += 1
+
+    def stats(self):
+        return {'resident': len(self._states), 'evictions': self.evictions}
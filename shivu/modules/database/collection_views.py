@@ -0,0 +1,167 @@
+"""
+Prepared per-user views of a collection.
+CollectionView serves collection.<user_id> inline queries: the user's
+unique characters in harem order, copies per character, copies per anime
+and a token index over the characters, so typing and scrolling through a
+large harem never rescans the array. HaremView serves /harem: the
+collection sorted by (anime, id) once per display mode, so any page is a
+slice.
+
+Views are dropped as soon as the user's ownership changes (ownership
+listener) or the favourite or display mode is changed, with a TTL as a
+backstop for writes that bypass the hooks.
+"""
+
+from cachetools import LRUCache, TTLCache
+
+from shivu.modules.database.ownership import add_ownership_listener
+from shivu.modules.database.search_index import TextIndex, normalize
+from shivu.modules.database.users import fetch_user
+
+VIEW_TTL = 600
+
+_views = TTLCache(maxsize=2000, ttl=VIEW_TTL)
+_harem_views = TTLCache(maxsize=2000, ttl=VIEW_TTL)
+# user_id -> [loads in flight, invalidation generation], only while loading
+_loading = {}
+
+
+class CollectionView:
+    __slots__ = ('user_id', 'first_name', 'favorite', 'characters', 'copies', 'anime_counts', 'index', '_results')
+
+    def __init__(self, user):
+        self.user_id = user.get('id')
+        self.first_name = user.get('first_name', 'User')
+        self.characters = []
+        self.copies = {}
+        self.anime_counts = {}
+        self.index = TextIndex(trigrams=False)
+        self._results = LRUCache(maxsize=64)
+
+        positions = {}
+        for char in user.get('characters', []):
+            if not isinstance(char, dict) or not char.get('id'):
+                continue
+            char_id = char['id']
+            anime = char.get('anime')
+            self.anime_counts[anime] = self.anime_counts.get(anime, 0) + 1
+            self.copies[char_id] = self.copies.get(char_id, 0) + 1
+            if char_id not in positions:
+                positions[char_id] = len(self.characters)
+                self.index.add(len(self.characters), char, sort_tokens=False)
+                self.characters.append(char)
+        self.index.finish()
+
+        # Favourite is stored either as the character dict or as its id
+        favorite = user.get('favorites')
+        if isinstance(favorite, str):
+            pos = positions.get(favorite)
+            favorite = self.characters[pos] if pos is not None else None
+        self.favorite = favorite if isinstance(favorite, dict) else None
+
+    def is_favorite(self, char_id):
+        return self.favorite is not None and self.favorite.get('id') == char_id
+
+    def search(self, query=''):
+        """Characters to list for a query: favourite first when there is no query"""
+        needle = normalize(query)
+        cached = self._results.get(needle)
+        if cached is not None:
+            return cached
+
+        if needle:
+            results = [self.characters[pos] for pos in self.index.search(needle, limit=len(self.characters))]
+        elif self.favorite is not None:
+            fav_id = self.favorite.get('id')
+            results = [self.favorite] + [c for c in self.characters if c.get('id') != fav_id]
+        else:
+            results = self.characters
+        self._results[needle] = results
+        return results
+
+
+class HaremView:
+    __slots__ = ('user_id', 'first_name', 'favorite', 'mode', 'characters', '_sorted', '_anime_counts')
+
+    def __init__(self, user):
+        self.user_id = user.get('id')
+        self.first_name = user.get('first_name', 'User')
+        self.characters = [char for char in user.get('characters', []) if isinstance(char, dict)]
+        self.mode = user.get('smode', 'default')
+        favorite = user.get('favorites')
+        self.favorite = favorite if isinstance(favorite, dict) else None
+        self._sorted = {}
+        self._anime_counts = None
+
+    def sorted_characters(self, rarity=None):
+        """(characters of that rarity sorted by anime and id, copies per id); rarity None means all"""
+        cached = self._sorted.get(rarity)
+        if cached is None:
+            chars = self.characters
+            if rarity is not None:
+                chars = [char for char in chars if char.get('rarity') == rarity]
+            chars = sorted(chars, key=lambda x: (x.get('anime', ''), x.get('id', '')))
+            counts = {}
+            for char in chars:
+                char_id = char.get('id')
+                if char_id:
+                    counts[char_id] = counts.get(char_id, 0) + 1
+            cached = self._sorted[rarity] = (chars, counts)
+        return cached
+
+    @property
+    def anime_counts(self):
+        """anime -> copies the user owns, keyed by the embedded anime name"""
+        if self._anime_counts is None:
+            counts = {}
+            for char in self.characters:
+                anime = char.get('anime', 'Unknown')
+                counts[anime] = counts.get(anime, 0) + 1
+            self._anime_counts = counts
+        return self._anime_counts
+
+
+async def _cached_view(cache, user_id, view_name, factory):
+    view = cache.get(user_id)
+    if view is None:
+        entry = _loading.setdefault(user_id, [0, 0])
+        entry[0] += 1
+        started = entry[1]
+        try:
+            user = await fetch_user(user_id, view_name)
+        finally:
+            entry[0] -= 1
+            if not entry[0]:
+                _loading.pop(user_id, None)
+        if not user:
+            return None
+        view = factory(user)
+        # Don't cache a view that may have missed a change to this user made while loading
+        if started == entry[1]:
+            cache[user_id] = view
+    return view
+
+
+async def get_collection_view(user_id):
+    """Cached view of a user's collection, or None for unknown users"""
+    return await _cached_view(_views, user_id, 'collection', CollectionView)
+
+
+async def get_harem_view(user_id):
+    """Cached /harem view of a user's collection, or None for unknown users"""
+    return await _cached_view(_harem_views, user_id, 'harem', HaremView)
+
+
+def invalidate_collection_view(user_id):
+    entry = _loading.get(user_id)
+    if entry is not None:
+        entry[1] += 1
+    _views.pop(user_id, None)
+    _harem_views.pop(user_id, None)
+
+
+def _on_ownership_change(user_id, copies, gained, lost):
+    invalidate_collection_view(user_id)
+
+
+add_ownership_listener(_on_ownership_change)
@@ -0,0 +1,35 @@
+"""
+Streaming document exports for /list and /groups.
+Rows go straight from a projected cursor through gzip into a unique temp
+file, so memory stays flat however many documents there are and
+concurrent exports never share a file.
+"""
+
+import csv
+import gzip
+import json
+import os
+import tempfile
+
+EXPORT_BATCH = 1000
+
+
+async def export_cursor(cursor, fields, fmt='csv'):
+    """Write every document from cursor as gzipped CSV (with header) or JSONL; returns the temp file path"""
+    fd, path = tempfile.mkstemp(prefix='export_', suffix=f'.{fmt}.gz')
+    os.close(fd)
+    try:
+        with gzip.open(path, 'wt', encoding='utf-8', newline='') as out:
+            if fmt == 'csv':
+                writer = csv.writer(out)
+                writer.writerow(fields)
+                async for doc in cursor.batch_size(EXPORT_BATCH):
+                    writer.writerow(['' if doc.get(field) is None else doc.get(field) for field in fields])
+            else:
+                async for doc in cursor.batch_size(EXPORT_BATCH):
+                    out.write(json.dumps({field: doc.get(field) for field in fields}, ensure_ascii=False, default=str))
+                    out.write('\n')
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
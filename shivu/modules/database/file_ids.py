@@ -0,0 +1,74 @@
+"""
+Telegram file_id resolution for character photos.
+Sending by img_url makes Telegram fetch the image host every time; sending by
+file_id does not. The catalog already stores the file_id of the channel post,
+and the first successful URL send records one for characters that lack it.
+Both the PTB application and the pyrogram client send through
+send_character_photo, so a stale file_id falls back to img_url either way.
+"""
+
+from pyrogram.errors import BadRequest as PyrogramBadRequest
+from telegram.error import BadRequest
+
+from shivu import collection, LOGGER
+from shivu.modules.database.catalog import get_character
+
+
+def _catalog_entry(character):
+    """Catalog document matching this (possibly embedded) character copy"""
+    catalog_char = get_character(character.get('id'))
+    if catalog_char and catalog_char.get('img_url') == character.get('img_url'):
+        return catalog_char
+    return None
+
+
+def resolve_photo(character):
+    """Best photo argument for a character: cached file_id, else img_url"""
+    source = _catalog_entry(character) or character
+    if not source.get('is_video') and source.get('file_id'):
+        return source['file_id']
+    return character.get('img_url')
+
+
+async def remember_file_id(character, message):
+    """Store the file_id Telegram assigned to a photo we sent by URL"""
+    catalog_char = _catalog_entry(character)
+    if not catalog_char or not message or not message.photo:
+        return
+    # PTB gives every size (largest last), pyrogram only the largest
+    photo = message.photo[-1] if isinstance(message.photo, (list, tuple)) else message.photo
+    catalog_char['file_id'] = photo.file_id
+    catalog_char['file_unique_id'] = photo.file_unique_id
+    try:
+        await collection.update_one(
+            {'id': catalog_char['id'], 'img_url': catalog_char['img_url']},
+            {'$set': {'file_id': photo.file_id, 'file_unique_id': photo.file_unique_id}}
+        )
+    except Exception as e:
+        LOGGER.error(f"Error saving file_id for {catalog_char['id']}: {e}")
+
+
+def forget_file_id(character):
+    catalog_char = _catalog_entry(character)
+    if catalog_char:
+        catalog_char.pop('file_id', None)
+        catalog_char.pop('file_unique_id', None)
+
+
+async def send_character_photo(send, character, **kwargs):
+    """
+    Send a character photo through send (a bound send_photo/reply_photo of
+    either client). Tries the file_id first and only falls back to img_url
+    on a miss.
+    """
+    photo = resolve_photo(character)
+    if photo and photo != character.get('img_url'):
+        try:
+            return await send(photo=photo, **kwargs)
+        except (BadRequest, PyrogramBadRequest) as e:
+            LOGGER.warning(f"Stale file_id for character {character.get('id')}: {e}")
+            forget_file_id(character)
+
+    message = await send(photo=character.get('img_url', ''), **kwargs)
+    await remember_file_id(character, message)
+    return message
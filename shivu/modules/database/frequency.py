@@ -0,0 +1,38 @@
+"""
+Per-chat spawn frequency, cached in memory.
+message_counter reads this on every group message, so the value is loaded
+lazily once per chat and then served from an LRU until /changetime or /ctime
+write a new one.
+"""
+
+from cachetools import LRUCache
+
+from shivu import user_totals_collection
+
+DEFAULT_MESSAGE_FREQUENCY = 70
+FREQUENCY_CACHE_LIMIT = 50000
+
+_frequencies = LRUCache(maxsize=FREQUENCY_CACHE_LIMIT)
+
+
+async def get_chat_message_frequency(chat_id):
+    """Get message frequency for chat"""
+    frequency = _frequencies.get(chat_id)
+    if frequency is not None:
+        return frequency
+    try:
+        chat_frequency = await user_totals_collection.find_one({'chat_id': chat_id}, {'message_frequency': 1})
+        if chat_frequency:
+            frequency = chat_frequency.get('message_frequency', DEFAULT_MESSAGE_FREQUENCY)
+        else:
+            await user_totals_collection.insert_one({'chat_id': chat_id, 'message_frequency': DEFAULT_MESSAGE_FREQUENCY})
+            frequency = DEFAULT_MESSAGE_FREQUENCY
+        _frequencies[chat_id] = frequency
+        return frequency
+    except:
+        return DEFAULT_MESSAGE_FREQUENCY
+
+
+def set_cached_frequency(chat_id, frequency):
+    """Record a frequency that was just written to the database"""
+    _frequencies[chat_id] = frequency
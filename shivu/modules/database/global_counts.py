@@ -0,0 +1,125 @@
+"""
+Materialized global ownership counts.
+Keeps, per character id, how many users own it and how many copies exist,
+so character cards need one in-memory batch lookup instead of a
+count_documents per card. The counts start from a full aggregation and
+follow every grant/removal through the ownership listener.
+
+Until the ownership store is backfilled they are recounted from the users
+collection every REBUILD_INTERVAL: hooks for users the backfill has not
+reached cannot give copy deltas for whole-array rewrites, so the counts may
+drift by those until the next recount. Once the store is ready they are
+rebuilt from it one last time and then kept by the listener deltas alone,
+which from then on move exactly as the store rows do.
+"""
+
+import asyncio
+
+from shivu import user_collection, LOGGER
+from shivu.modules.database.ownership import add_ownership_listener, ownership_collection, ownership_ready
+
+REBUILD_INTERVAL = 1800
+
+_owners = {}
+_copies = {}
+_built = False
+_rebuild_lock = asyncio.Lock()
+_scheduler = None
+
+
+def _apply(copies, gained, lost):
+    for char_id, n in copies.items():
+        _copies[char_id] = max(_copies.get(char_id, 0) + n, 0)
+    for char_id in gained:
+        _owners[char_id] = _owners.get(char_id, 0) + 1
+    for char_id in lost:
+        _owners[char_id] = max(_owners.get(char_id, 0) - 1, 0)
+
+
+def _on_ownership_change(user_id, copies, gained, lost):
+    # During a rebuild this keeps the counts being served current; the rebuilt
+    # counts replace them wholesale, since we cannot tell which of these
+    # changes the aggregation already saw. Changes committed after the
+    # aggregation read their user are missed until the next rebuild.
+    if _built:
+        _apply(copies, gained, lost)
+
+
+async def rebuild_global_counts(if_missing=False):
+    """Recount owners and copies for every character; True if counted from the ownership store"""
+    global _owners, _copies, _built
+    async with _rebuild_lock:
+        if if_missing and _built:
+            return False
+        from_store = await ownership_ready()
+        if from_store:
+            pipeline = [
+                {'$group': {'_id': '$character_id', 'owners': {'$sum': 1}, 'copies': {'$sum': '$count'}}},
+            ]
+            cursor = ownership_collection.aggregate(pipeline, allowDiskUse=True)
+        else:
+            pipeline = [
+                {'$project': {'_id': 0, 'id': 1, 'characters.id': 1}},
+                {'$unwind': '$characters'},
+                {'$group': {'_id': {'char': '$characters.id', 'user': '$id'}, 'n': {'$sum': 1}}},
+                {'$group': {'_id': '$_id.char', 'owners': {'$sum': 1}, 'copies': {'$sum': '$n'}}},
+            ]
+            cursor = user_collection.aggregate(pipeline, allowDiskUse=True)
+
+        owners, copies = {}, {}
+        async for doc in cursor:
+            if doc['_id'] is not None:
+                owners[doc['_id']] = doc.get('owners', 0)
+                copies[doc['_id']] = doc.get('copies', 0)
+        _owners, _copies = owners, copies
+        _built = True
+        LOGGER.info(f"Global ownership counts rebuilt: {len(owners)} characters")
+        return from_store
+
+
+async def _ensure_built():
+    if not _built:
+        await rebuild_global_counts(if_missing=True)
+
+
+async def get_owner_counts(character_ids):
+    """character_id -> number of users owning it, for a whole page at once"""
+    await _ensure_built()
+    return {char_id: _owners.get(char_id, 0) for char_id in character_ids}
+
+
+async def get_owner_count(character_id):
+    return (await get_owner_counts([character_id]))[character_id]
+
+
+async def get_copy_count(character_id):
+    """Total copies of a character across all users"""
+    await _ensure_built()
+    return _copies.get(character_id, 0)
+
+
+async def _rebuild_loop():
+    while True:
+        try:
+            if await rebuild_global_counts():
+                return
+        except Exception as e:
+            LOGGER.error(f"Error rebuilding global ownership counts: {e}")
+        await asyncio.sleep(REBUILD_INTERVAL)
+
+
+def start_global_counts():
+    """Build the counts now and recount in the background until the ownership store is ready"""
+    global _scheduler
+    if _scheduler is None or _scheduler.done():
+        _scheduler = asyncio.create_task(_rebuild_loop())
+
+
+def stop_global_counts():
+    global _scheduler
+    if _scheduler is not None:
+        _scheduler.cancel()
+        _scheduler = None
+
+
+add_ownership_listener(_on_ownership_change)
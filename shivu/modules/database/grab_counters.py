@@ -0,0 +1,145 @@
+"""
+Write-behind buffer for grab counters.
+A grab only has to persist ownership right away; the per-group user totals,
+the global group totals and the pass grab task are counters, so they are
+aggregated in memory and flushed as unordered bulk upserts every few seconds
+and once more on shutdown. Listeners registered with add_grab_listener
+hear about each grab as it is recorded.
+"""
+
+import asyncio
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from shivu import (
+    LOGGER,
+    user_collection,
+    group_user_totals_collection,
+    top_global_groups_collection,
+)
+
+FLUSH_INTERVAL = 5
+
+_group_users = {}
+_groups = {}
+_pass_grabs = {}
+_flush_lock = asyncio.Lock()
+_flusher = None
+_listeners = []
+
+
+def add_grab_listener(listener):
+    """Call listener(user_id, chat_id, username, first_name, group_name) for every recorded grab"""
+    _listeners.append(listener)
+
+
+def record_grab(user_id, chat_id, username, first_name, group_name):
+    """Queue the counter side effects of one successful grab"""
+    entry = _group_users.setdefault((user_id, chat_id), {'count': 0})
+    entry['count'] += 1
+    entry['first_name'] = first_name
+    if username:
+        entry['username'] = username
+
+    group = _groups.setdefault(chat_id, {'count': 0})
+    group['count'] += 1
+    group['group_name'] = group_name
+
+    _pass_grabs[user_id] = _pass_grabs.get(user_id, 0) + 1
+
+    for listener in _listeners:
+        try:
+            listener(user_id, chat_id, username, first_name, group_name)
+        except Exception as e:
+            LOGGER.error(f"Grab listener failed for {user_id} in {chat_id}: {e}")
+
+
+def _merge_back(group_users, groups, pass_grabs):
+    """Put counters from a failed flush back so they go out with the next one"""
+    for key, data in group_users.items():
+        entry = _group_users.setdefault(key, {'count': 0})
+        entry['count'] += data['count']
+        for field in ('username', 'first_name'):
+            if field in data:
+                entry.setdefault(field, data[field])
+    for chat_id, data in groups.items():
+        group = _groups.setdefault(chat_id, {'count': 0, 'group_name': data['group_name']})
+        group['count'] += data['count']
+    for user_id, count in pass_grabs.items():
+        _pass_grabs[user_id] = _pass_grabs.get(user_id, 0) + count
+
+
+async def _bulk_write(collection, pending, make_op):
+    """Write one op per pending item; returns the items whose write did not happen"""
+    if not pending:
+        return {}
+    keys = list(pending)
+    try:
+        await collection.bulk_write([make_op(key, pending[key]) for key in keys], ordered=False)
+        return {}
+    except BulkWriteError as e:
+        # Unordered: every op not listed in writeErrors was applied already
+        failed = {keys[err['index']] for err in e.details.get('writeErrors', [])}
+        LOGGER.error(f"Error flushing grab counters: {len(failed)} of {len(keys)} writes failed")
+        return {key: pending[key] for key in failed}
+    except Exception as e:
+        LOGGER.error(f"Error flushing grab counters: {e}")
+        return pending
+
+
+async def flush_grab_counters():
+    """Write every pending counter with one bulk_write per collection"""
+    global _group_users, _groups, _pass_grabs
+    async with _flush_lock:
+        group_users, groups, pass_grabs = _group_users, _groups, _pass_grabs
+        if not (group_users or groups or pass_grabs):
+            return
+        _group_users, _groups, _pass_grabs = {}, {}, {}
+
+        failed_group_users = await _bulk_write(
+            group_user_totals_collection, group_users,
+            lambda key, data: UpdateOne(
+                {'user_id': key[0], 'group_id': key[1]},
+                {'$set': {k: v for k, v in data.items() if k != 'count'},
+                 '$inc': {'count': data['count']}},
+                upsert=True
+            )
+        )
+        failed_groups = await _bulk_write(
+            top_global_groups_collection, groups,
+            lambda chat_id, data: UpdateOne(
+                {'group_id': chat_id},
+                {'$set': {'group_name': data['group_name']}, '$inc': {'count': data['count']}},
+                upsert=True
+            )
+        )
+        failed_pass_grabs = await _bulk_write(
+            user_collection, pass_grabs,
+            lambda user_id, count: UpdateOne(
+                {'id': user_id, 'pass_data': {'$exists': True}},
+                {'$inc': {'pass_data.tasks.grabs': count}}
+            )
+        )
+        _merge_back(failed_group_users, failed_groups, failed_pass_grabs)
+
+
+async def _flush_loop():
+    while True:
+        await asyncio.sleep(FLUSH_INTERVAL)
+        await flush_grab_counters()
+
+
+def start_grab_flusher():
+    global _flusher
+    if _flusher is None or _flusher.done():
+        _flusher = asyncio.create_task(_flush_loop())
+
+
+async def stop_grab_flusher():
+    """Stop the periodic flush and write whatever is still buffered"""
+    global _flusher
+    if _flusher is not None:
+        _flusher.cancel()
+        _flusher = None
+    await flush_grab_counters()
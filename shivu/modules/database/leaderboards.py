@@ -0,0 +1,178 @@
+"""
+Leaderboard snapshots for /gstop, /TopGroups and /topchat.
+Each board keeps only its top LEADERBOARD_KEEP rows (users by characters
+owned, groups by grabs, a chat's users by grabs there), loaded with one
+sorted, limited query. Grab and ownership events move the tracked rows'
+counts in place, so showing a board is a memory read; a row outside the
+snapshot can only climb in at the next full recompute, which runs in the
+background once a board is older than REFRESH_INTERVAL.
+"""
+
+import asyncio
+import heapq
+import time
+from functools import partial
+
+from cachetools import LRUCache
+from pymongo import ASCENDING, DESCENDING
+
+from shivu import user_collection, group_user_totals_collection, top_global_groups_collection, LOGGER
+from shivu.modules.database.grab_counters import add_grab_listener, flush_grab_counters
+from shivu.modules.database.ownership import add_ownership_listener, stats_ready
+from shivu.modules.database.user_stats import stats_collection
+
+REFRESH_INTERVAL = 300
+LEADERBOARD_KEEP = 100
+
+_indexes_ready = False
+
+
+class Leaderboard:
+    """Top rows of one ranking, keyed by `key`, with counts kept current between rebuilds"""
+
+    __slots__ = ('loader', 'key', 'keep', 'entries', 'complete', 'built_at', '_lock', '_refresher')
+
+    def __init__(self, loader, key, keep=LEADERBOARD_KEEP):
+        self.loader = loader
+        self.key = key
+        self.keep = keep
+        self.entries = {}
+        self.complete = False
+        self.built_at = None
+        self._lock = asyncio.Lock()
+        self._refresher = None
+
+    async def rebuild(self):
+        async with self._lock:
+            rows = await self.loader(self.keep)
+            self.entries = {row[self.key]: row for row in rows if row.get(self.key) is not None}
+            # Fewer rows than we keep means everyone is tracked, so newcomers can be added
+            self.complete = len(rows) < self.keep
+            self.built_at = time.time()
+
+    async def _rebuild_in_background(self):
+        try:
+            await self.rebuild()
+        except Exception as e:
+            LOGGER.error(f"Error rebuilding leaderboard: {e}")
+
+    def apply(self, key, delta, fields=None):
+        """Move one row's count by delta"""
+        entry = self.entries.get(key)
+        if entry is None:
+            if self.built_at is None or not self.complete:
+                return
+            entry = self.entries[key] = {self.key: key, 'count': 0}
+        entry['count'] = max(entry.get('count', 0) + delta, 0)
+        if fields:
+            entry.update(fields)
+
+    async def top(self, n=10):
+        """(top n rows, snapshot age in seconds)"""
+        if self.built_at is None:
+            await self.rebuild()
+        elif time.time() - self.built_at > REFRESH_INTERVAL and (self._refresher is None or self._refresher.done()):
+            # Serve the current snapshot while a new one is built
+            self._refresher = asyncio.create_task(self._rebuild_in_background())
+        rows = heapq.nlargest(n, self.entries.values(), key=lambda row: row.get('count', 0))
+        return rows, time.time() - self.built_at
+
+
+async def _ensure_indexes():
+    global _indexes_ready
+    if not _indexes_ready:
+        await group_user_totals_collection.create_index([('group_id', ASCENDING), ('count', DESCENDING)])
+        await top_global_groups_collection.create_index([('count', DESCENDING)])
+        await stats_collection.create_index([('total', DESCENDING)])
+        _indexes_ready = True
+
+
+async def _load_users(limit):
+    await _ensure_indexes()
+    if await stats_ready():
+        rows = await stats_collection.find({}, {'_id': 0, 'user_id': 1, 'total': 1}) \
+            .sort('total', DESCENDING).limit(limit).to_list(length=limit)
+        names = {}
+        cursor = user_collection.find(
+            {'id': {'$in': [row['user_id'] for row in rows]}},
+            {'_id': 0, 'id': 1, 'username': 1, 'first_name': 1}
+        )
+        async for user in cursor:
+            names[user['id']] = user
+        return [
+            {
+                'user_id': row['user_id'],
+                'username': names.get(row['user_id'], {}).get('username'),
+                'first_name': names.get(row['user_id'], {}).get('first_name'),
+                'count': row.get('total', 0),
+            }
+            for row in rows
+        ]
+
+    cursor = user_collection.aggregate([
+        {"$match": {"characters": {"$exists": True, "$type": "array"}}},
+        {"$project": {"_id": 0, "user_id": "$id", "username": 1, "first_name": 1, "count": {"$size": "$characters"}}},
+        {"$sort": {"count": -1}},
+        {"$limit": limit}
+    ], allowDiskUse=True)
+    return await cursor.to_list(length=limit)
+
+
+async def _load_groups(limit):
+    await _ensure_indexes()
+    await flush_grab_counters()
+    cursor = top_global_groups_collection.find({}, {'_id': 0, 'group_id': 1, 'group_name': 1, 'count': 1})
+    return await cursor.sort('count', DESCENDING).limit(limit).to_list(length=limit)
+
+
+async def _load_chat_users(chat_id, limit):
+    await _ensure_indexes()
+    await flush_grab_counters()
+    cursor = group_user_totals_collection.find(
+        {'group_id': chat_id},
+        {'_id': 0, 'user_id': 1, 'username': 1, 'first_name': 1, 'count': 1}
+    )
+    return await cursor.sort('count', DESCENDING).limit(limit).to_list(length=limit)
+
+
+_users = Leaderboard(_load_users, 'user_id')
+_groups = Leaderboard(_load_groups, 'group_id')
+_chats = LRUCache(maxsize=1000)
+
+
+async def get_top_users(n=10):
+    """Users with the most characters: (rows, snapshot age in seconds)"""
+    return await _users.top(n)
+
+
+async def get_top_groups(n=10):
+    """Groups with the most grabs: (rows, snapshot age in seconds)"""
+    return await _groups.top(n)
+
+
+async def get_top_chat_users(chat_id, n=10):
+    """Users with the most grabs in one chat: (rows, snapshot age in seconds)"""
+    board = _chats.get(chat_id)
+    if board is None:
+        board = _chats[chat_id] = Leaderboard(partial(_load_chat_users, chat_id), 'user_id')
+    return await board.top(n)
+
+
+def _on_ownership_change(user_id, copies, gained, lost):
+    delta = sum(copies.values())
+    if delta:
+        _users.apply(user_id, delta)
+
+
+def _on_grab(user_id, chat_id, username, first_name, group_name):
+    _groups.apply(chat_id, 1, {'group_name': group_name})
+    board = _chats.get(chat_id)
+    if board is not None:
+        fields = {'first_name': first_name}
+        if username:
+            fields['username'] = username
+        board.apply(user_id, 1, fields)
+
+
+add_ownership_listener(_on_ownership_change)
+add_grab_listener(_on_grab)
@@ -0,0 +1,503 @@
+"""
+Character ownership.
+
+Writes: every grant of a character (grab, marry, raid, give, redeem) goes
+through grant_character so it costs exactly one atomic upsert on the user
+document; its store and stat hook runs afterwards as a tracked background
+task, off the request path. Modules that change the embedded `characters`
+array themselves call record_grant / record_revoke / record_replace
+afterwards.
+
+Those hooks keep the normalized ownership store (user_characters: one
+document per user_id + character_id holding a count) and the per-user
+counters in user_stats in step with the embedded arrays. migrate_ownership
+and backfill_user_stats rebuild both from the arrays in resumable batches,
+and get_owned_counts / get_user_characters / get_user_stats give modules
+one read API that switches over once the matching backfill has finished.
+
+While a backfill runs, hooks for users in its current batch are tracked and
+those users are re-read and rebuilt after the batch, so a live write never
+gets overwritten by a stale snapshot. For users the backfill has not reached
+yet the store is incomplete, so listeners get gained/lost from the embedded
+array instead (and no copy deltas for whole-array rewrites).
+
+Listeners only get deltas for hook writes that landed; when a hook fails
+they are just told the user changed, so views are dropped without moving
+any counts.
+"""
+
+import asyncio
+import time
+from collections import Counter
+
+from pymongo import ASCENDING, DESCENDING, DeleteMany, UpdateOne
+
+from shivu import db, user_collection, LOGGER
+from shivu.modules.database.catalog import get_character
+from shivu.modules.database.user_stats import (
+    stats_collection, tally, add_stats, set_stats, read_stats, format_stats,
+)
+
+ownership_collection = db['user_characters']
+migrations_collection = db['migrations']
+
+MIGRATION_ID = 'user_characters'
+STATS_MIGRATION_ID = 'user_stats'
+MIGRATION_BATCH = 200
+MIGRATION_PAUSE = 0.5
+_READY_RECHECK = 60
+
+_migrations_done = set()
+_ready_checked_at = {}
+_migration_lock = asyncio.Lock()
+_listeners = []
+
+_PROGRESS_RECHECK = 5
+_progress = None
+_progress_checked_at = None
+# Users in the batch a backfill is writing, hooks running per user, and batch users a hook touched
+_batch_users = set()
+_hooks_in_flight = {}
+_touched = set()
+# Background grant hooks, kept referenced until they finish
+_hook_tasks = set()
+
+
+def _count_ids(characters):
+    counts = Counter()
+    for char in characters or []:
+        char_id = char.get('id') if isinstance(char, dict) else char
+        if char_id is not None:
+            counts[char_id] += 1
+    return counts
+
+
+async def grant_character(user_id, character, username=None, first_name=None, on_insert=None):
+    """
+    Push a character to a user's collection, creating the user if needed.
+    username/first_name are refreshed when given; on_insert holds defaults
+    that only apply to brand new user documents.
+    """
+    profile = {}
+    if username:
+        profile['username'] = username
+    if first_name:
+        profile['first_name'] = first_name
+
+    update = {'$push': {'characters': character}}
+    if profile:
+        update['$set'] = profile
+
+    defaults = {k: v for k, v in (on_insert or {}).items() if k not in profile}
+    if defaults:
+        update['$setOnInsert'] = defaults
+
+    # Counted from before the push, so a backfill batch never misses it
+    _enter(user_id)
+    try:
+        result = await user_collection.update_one({'id': user_id}, update, upsert=True)
+    except BaseException:
+        _leave(user_id)
+        raise
+    # Cached views go stale now; counts move once the hook has written
+    _changed(user_id)
+    task = asyncio.create_task(_grant_hook(user_id, character))
+    _hook_tasks.add(task)
+    task.add_done_callback(_hook_tasks.discard)
+    return result
+
+
+async def _grant_hook(user_id, character):
+    try:
+        await record_grant(user_id, [character])
+    finally:
+        _leave(user_id)
+
+
+async def drain_ownership_hooks():
+    """Wait for background grant hooks (on shutdown)"""
+    if _hook_tasks:
+        await asyncio.gather(*list(_hook_tasks), return_exceptions=True)
+
+
+# ==================== STORE HOOKS ====================
+
+def add_ownership_listener(listener):
+    """
+    Call listener(user_id, copies, gained, lost) after a user's characters
+    change: copies maps character_id -> change in copies, gained/lost are
+    the character ids the user started or stopped owning.
+    """
+    _listeners.append(listener)
+
+
+def _changed(user_id, copies=None, gained=(), lost=()):
+    for listener in _listeners:
+        try:
+            listener(user_id, copies or {}, gained, lost)
+        except Exception as e:
+            LOGGER.error(f"Ownership listener failed for {user_id}: {e}")
+
+
+def _enter(user_id):
+    _hooks_in_flight[user_id] = _hooks_in_flight.get(user_id, 0) + 1
+
+
+def _leave(user_id):
+    left = _hooks_in_flight.get(user_id, 1) - 1
+    if left:
+        _hooks_in_flight[user_id] = left
+    else:
+        _hooks_in_flight.pop(user_id, None)
+    if user_id in _batch_users:
+        _touched.add(user_id)
+
+
+async def _backfill_progress():
+    """Highest user _id either backfill has written (re-read every few seconds)"""
+    global _progress, _progress_checked_at
+    now = time.monotonic()
+    if _progress_checked_at is None or now - _progress_checked_at > _PROGRESS_RECHECK:
+        _progress_checked_at = now
+        last_ids = []
+        for migration_id in (MIGRATION_ID, STATS_MIGRATION_ID):
+            last_id = (await get_migration_state(migration_id)).get('last_id')
+            if last_id is not None:
+                last_ids.append(last_id)
+        _progress = max(last_ids) if last_ids else None
+    return _progress
+
+
+async def _store_complete(user_id):
+    """True when the ownership store holds this user's full collection"""
+    if await ownership_ready():
+        return True
+    if user_id in _batch_users:
+        return False
+    progress = await _backfill_progress()
+    if progress is None:
+        return False
+    user = await user_collection.find_one({'id': user_id}, {'_id': 1})
+    return user is not None and user['_id'] <= progress
+
+
+async def _array_counts(user_id, character_ids):
+    """Copies of the given ids in the user's embedded array, counted server-side"""
+    pipeline = [
+        {'$match': {'id': user_id}},
+        {'$project': {'_id': 0, 'ids': {'$filter': {
+            'input': {'$ifNull': ['$characters.id', []]},
+            'as': 'c',
+            'cond': {'$in': ['$$c', list(character_ids)]},
+        }}}},
+    ]
+    docs = await user_collection.aggregate(pipeline).to_list(length=1)
+    return Counter(docs[0].get('ids') or []) if docs else Counter()
+
+
+async def _owned_rows(user_id, character_ids=None):
+    query = {'user_id': user_id}
+    if character_ids is not None:
+        query['character_id'] = {'$in': list(character_ids)}
+    rows = ownership_collection.find(query, {'_id': 0, 'character_id': 1, 'count': 1})
+    return Counter({doc['character_id']: max(doc.get('count', 0), 0) async for doc in rows})
+
+
+async def record_grant(user_id, characters):
+    """Characters were pushed to the user's embedded array"""
+    counts, by_rarity, by_anime = tally(characters)
+    if not counts:
+        return
+    gained = []
+    _enter(user_id)
+    try:
+        complete = await _store_complete(user_id)
+        char_ids = list(counts)
+        result = await ownership_collection.bulk_write([
+            UpdateOne({'user_id': user_id, 'character_id': char_id}, {'$inc': {'count': counts[char_id]}}, upsert=True)
+            for char_id in char_ids
+        ], ordered=False)
+        if complete:
+            # Upserted rows are characters the user did not own before
+            gained = [char_ids[i] for i in result.upserted_ids]
+        else:
+            owned = await _array_counts(user_id, char_ids)
+            gained = [char_id for char_id in char_ids if owned[char_id] <= counts[char_id]]
+        await add_stats(user_id, sum(counts.values()), len(gained), by_rarity, by_anime)
+    except Exception as e:
+        LOGGER.error(f"Error recording grant for {user_id}: {e}")
+        _changed(user_id)
+    else:
+        _changed(user_id, counts, gained)
+    finally:
+        _leave(user_id)
+
+
+async def record_revoke(user_id, character_ids, all_copies=False):
+    """One copy of each id (or every copy, for $pull) left the user's array"""
+    counts = _count_ids(character_ids)
+    if not counts:
+        return
+    _enter(user_id)
+    try:
+        complete = await _store_complete(user_id)
+        if all_copies:
+            requested = list(counts)
+            counts = await _owned_rows(user_id, counts)
+            await ownership_collection.delete_many({'user_id': user_id, 'character_id': {'$in': requested}})
+            # Every copy was pulled; rows may be missing for users not backfilled yet
+            lost = list(counts) if complete else requested
+        else:
+            ops = [
+                UpdateOne({'user_id': user_id, 'character_id': char_id}, {'$inc': {'count': -n}})
+                for char_id, n in counts.items()
+            ]
+            ops.append(DeleteMany({'user_id': user_id, 'count': {'$lte': 0}}))
+            await ownership_collection.bulk_write(ops, ordered=True)
+            if complete:
+                remaining = await _owned_rows(user_id, counts)
+            else:
+                remaining = await _array_counts(user_id, counts)
+            lost = [char_id for char_id in counts if not remaining.get(char_id)]
+        if counts:
+            _, by_rarity, by_anime = tally(counts.elements())
+            await add_stats(user_id, sum(counts.values()), len(lost), by_rarity, by_anime, sign=-1)
+    except Exception as e:
+        LOGGER.error(f"Error recording revoke for {user_id}: {e}")
+        _changed(user_id)
+    else:
+        _changed(user_id, {char_id: -n for char_id, n in counts.items()}, (), lost)
+    finally:
+        _leave(user_id)
+
+
+async def _replace_rows(user_id, characters):
+    """Set the user's store rows and counters to match `characters`; returns (rows before, counts)"""
+    counts, by_rarity, by_anime = tally(characters)
+    before = await _owned_rows(user_id)
+    ops = [DeleteMany({'user_id': user_id, 'character_id': {'$nin': list(counts)}})]
+    ops.extend(
+        UpdateOne({'user_id': user_id, 'character_id': char_id}, {'$set': {'count': n}}, upsert=True)
+        for char_id, n in counts.items()
+    )
+    await ownership_collection.bulk_write(ops, ordered=True)
+    await set_stats(user_id, counts, by_rarity, by_anime)
+    return before, counts
+
+
+async def record_replace(user_id, characters):
+    """The user's whole embedded array was rewritten"""
+    _enter(user_id)
+    try:
+        complete = await _store_complete(user_id)
+        before, counts = await _replace_rows(user_id, characters)
+    except Exception as e:
+        LOGGER.error(f"Error recording replace for {user_id}: {e}")
+        _changed(user_id)
+    else:
+        if complete:
+            copies = {char_id: counts.get(char_id, 0) - before.get(char_id, 0) for char_id in set(counts) | set(before)}
+            _changed(
+                user_id,
+                {char_id: n for char_id, n in copies.items() if n},
+                [char_id for char_id in counts if char_id not in before],
+                [char_id for char_id in before if char_id not in counts],
+            )
+        else:
+            # The old collection is unknown, so only say that it changed
+            _changed(user_id)
+    finally:
+        _leave(user_id)
+
+
+# ==================== MIGRATION ====================
+
+async def ensure_ownership_indexes():
+    await ownership_collection.create_index([('user_id', ASCENDING), ('character_id', ASCENDING)], unique=True)
+    # Also serves top-owner queries: owners of a character already in (count desc, user_id) order
+    await ownership_collection.create_index(
+        [('character_id', ASCENDING), ('count', DESCENDING), ('user_id', ASCENDING)]
+    )
+    # Superseded by the index above, which has it as a prefix
+    if 'character_id_1_count_-1' in await ownership_collection.index_information():
+        await ownership_collection.drop_index('character_id_1_count_-1')
+    await stats_collection.create_index([('user_id', ASCENDING)], unique=True)
+
+
+async def get_migration_state(migration_id=MIGRATION_ID):
+    return await migrations_collection.find_one({'_id': migration_id}) or {}
+
+
+async def _backfill(migration_id, batch_size, pause):
+    """
+    Rebuild the ownership store and the user counters from the embedded
+    arrays. Walks users in _id order and checkpoints after each batch, so it
+    can be stopped at any time and resumed later; live writes keep flowing
+    through the record_* hooks meanwhile. Users a hook touched while their
+    batch was being written are re-read and rebuilt before moving on.
+    Listeners are not told about the rebuild itself.
+    """
+    async with _migration_lock:
+        await ensure_ownership_indexes()
+        state = await get_migration_state(migration_id)
+        if state.get('done'):
+            _migrations_done.add(migration_id)
+            return state
+
+        last_id = state.get('last_id')
+        processed = state.get('processed', 0)
+        projection = {'id': 1, 'characters.id': 1, 'characters.rarity': 1, 'characters.anime': 1}
+
+        while True:
+            query = {'_id': {'$gt': last_id}} if last_id else {}
+            users = await user_collection.find(query, projection) \
+                .sort('_id', ASCENDING).limit(batch_size).to_list(length=batch_size)
+            if not users:
+                break
+
+            await _rebuild_batch(users, projection)
+
+            last_id = users[-1]['_id']
+            processed += len(users)
+            await migrations_collection.update_one(
+                {'_id': migration_id},
+                {'$set': {'last_id': last_id, 'processed': processed, 'updated_at': time.time()}},
+                upsert=True
+            )
+            LOGGER.info(f"Backfill {migration_id}: {processed} users")
+            await asyncio.sleep(pause)
+
+        await migrations_collection.update_one(
+            {'_id': migration_id},
+            {'$set': {'done': True, 'processed': processed, 'updated_at': time.time()}},
+            upsert=True
+        )
+        _migrations_done.add(migration_id)
+        return await get_migration_state(migration_id)
+
+
+async def _rebuild_batch(users, projection):
+    user_ids = {user['id'] for user in users if 'id' in user}
+    _batch_users.update(user_ids)
+    try:
+        while users:
+            for user in users:
+                if 'id' in user:
+                    await _replace_rows(user['id'], user.get('characters') or [])
+            # Let running hooks finish, then redo anyone they touched from a fresh read
+            while any(user_id in _hooks_in_flight for user_id in user_ids):
+                await asyncio.sleep(0.05)
+            redo = _touched & user_ids
+            _touched.difference_update(redo)
+            users = await user_collection.find({'id': {'$in': list(redo)}}, projection).to_list(length=None) if redo else []
+    finally:
+        _batch_users.difference_update(user_ids)
+        _touched.difference_update(user_ids)
+
+
+async def refresh_owners(user_ids):
+    """
+    Rebuild the store rows and user_stats of these users from their embedded
+    arrays and tell listeners they changed. Counters are keyed by the
+    catalog's current rarity/anime, so a catalog edit has to run this for
+    the character's owners to move their counts to the new keys.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    projection = {'id': 1, 'characters.id': 1, 'characters.rarity': 1, 'characters.anime': 1}
+    users = await user_collection.find({'id': {'$in': user_ids}}, projection).to_list(length=None)
+    await _rebuild_batch(users, projection)
+    for user_id in user_ids:
+        _changed(user_id)
+
+
+async def migrate_ownership(batch_size=MIGRATION_BATCH, pause=MIGRATION_PAUSE):
+    """Backfill the ownership store (user_characters)"""
+    return await _backfill(MIGRATION_ID, batch_size, pause)
+
+
+async def backfill_user_stats(batch_size=MIGRATION_BATCH, pause=MIGRATION_PAUSE):
+    """
+    Backfill user_stats for every user. Runs the same rebuild as
+    migrate_ownership, so a finished stats backfill also leaves the
+    ownership store complete.
+    """
+    return await _backfill(STATS_MIGRATION_ID, batch_size, pause)
+
+
+async def _migration_ready(migration_id):
+    if migration_id in _migrations_done:
+        return True
+    now = time.monotonic()
+    checked_at = _ready_checked_at.get(migration_id)
+    if checked_at is None or now - checked_at > _READY_RECHECK:
+        _ready_checked_at[migration_id] = now
+        try:
+            if (await get_migration_state(migration_id)).get('done'):
+                _migrations_done.add(migration_id)
+        except Exception as e:
+            LOGGER.error(f"Error reading migration state {migration_id}: {e}")
+    return migration_id in _migrations_done
+
+
+async def ownership_ready():
+    """True once the ownership store is fully backfilled"""
+    return await _migration_ready(MIGRATION_ID) or await _migration_ready(STATS_MIGRATION_ID)
+
+
+async def stats_ready():
+    """True once user_stats is fully backfilled"""
+    return await _migration_ready(STATS_MIGRATION_ID)
+
+
+# ==================== READS ====================
+
+def hydrate(character_id):
+    """Catalog fields for an owned character id"""
+    return get_character(character_id) or {'id': character_id}
+
+
+async def get_owned_counts(user_id):
+    """character_id -> number of copies the user owns"""
+    if await ownership_ready():
+        docs = ownership_collection.find({'user_id': user_id}, {'_id': 0, 'character_id': 1, 'count': 1})
+        return {doc['character_id']: doc['count'] async for doc in docs if doc.get('count', 0) > 0}
+    user = await user_collection.find_one({'id': user_id}, {'characters.id': 1})
+    return dict(_count_ids(user.get('characters') if user else []))
+
+
+async def get_user_characters(user_id):
+    """
+    Drop-in replacement for user['characters']: one dict per owned copy.
+    Served from the ownership store (hydrated from the catalog) once it is
+    ready, from the embedded array before that.
+    """
+    if await ownership_ready():
+        characters = []
+        for char_id, count in (await get_owned_counts(user_id)).items():
+            characters.extend([hydrate(char_id)] * count)
+        return characters
+    user = await user_collection.find_one({'id': user_id}, {'characters': 1})
+    return (user.get('characters') or []) if user else []
+
+
+async def get_user_stats(user_id, characters=None):
+    """
+    {'total', 'unique', 'by_rarity', 'by_anime'} for a user.
+    Read from user_stats once the backfill has finished; before that it is
+    tallied from `characters` when the caller already has them, or from the
+    embedded array.
+    """
+    if await stats_ready():
+        stats = await read_stats(user_id)
+        if stats is not None:
+            return stats
+        return format_stats(0, 0, {}, {})
+    if characters is None:
+        user = await user_collection.find_one(
+            {'id': user_id}, {'characters.id': 1, 'characters.rarity': 1, 'characters.anime': 1}
+        )
+        characters = (user.get('characters') or []) if user else []
+    counts, by_rarity, by_anime = tally(characters)
+    return format_stats(sum(counts.values()), len(counts), by_rarity, by_anime)
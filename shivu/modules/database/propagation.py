@@ -0,0 +1,161 @@
+"""
+Background propagation of catalog edits into user collections.
+Every user keeps embedded copies of the characters they own (and of their
+favourite), so renaming a character or changing its anime, rarity or media
+leaves those copies stale. A catalog edit event queues a job per character
+holding the new field values; one worker applies each job with
+update_many + arrayFilters over consecutive _id ranges of owners, pausing
+between chunks.
+
+When the edit moves rarity or anime, each chunk's owners then go through
+ownership.refresh_owners, which re-tallies their user_stats under the new
+keys and drops their cached collection and harem views; other edits only
+drop the views.
+
+Jobs live in catalog_propagation with an _id checkpoint, so a restart
+resumes where it stopped. Editing the same character again bumps the job's
+generation and restarts it from the first owner with the merged fields.
+"""
+
+import asyncio
+import time
+
+from shivu import db, user_collection, LOGGER
+from shivu.modules.database.catalog import add_edit_listener
+from shivu.modules.database.collection_views import invalidate_collection_view
+from shivu.modules.database.ownership import refresh_owners
+
+jobs_collection = db['catalog_propagation']
+
+PROPAGATED_FIELDS = ('name', 'anime', 'rarity', 'img_url', 'is_video')
+# Fields user_stats counters are keyed by; only edits to these need a re-tally
+TALLIED_FIELDS = {'anime', 'rarity'}
+CHUNK_SIZE = 500
+CHUNK_PAUSE = 0.5
+RETRY_PAUSE = 30
+PROGRESS_EVERY = 20
+
+_wake = asyncio.Event()
+_worker = None
+_queued = set()
+
+
+async def queue_propagation(char_id, fields):
+    """Queue (or restart) the job copying `fields` into every owner's copies of char_id"""
+    update = {f'fields.{field}': value for field, value in fields.items()}
+    update.update({'last_id': None, 'processed': 0, 'modified': 0, 'done': False, 'queued_at': time.time()})
+    await jobs_collection.update_one(
+        {'_id': char_id},
+        {'$set': update, '$inc': {'generation': 1}},
+        upsert=True,
+    )
+    _wake.set()
+    LOGGER.info(f"[PROPAGATION] Queued {char_id}: {', '.join(fields)}")
+
+
+def _on_catalog_edit(char_id, old, new):
+    changed = {field: new[field] for field in PROPAGATED_FIELDS if field in new and old.get(field) != new[field]}
+    if not changed:
+        return
+    try:
+        task = asyncio.get_running_loop().create_task(queue_propagation(char_id, changed))
+    except RuntimeError:
+        return
+    _queued.add(task)
+    task.add_done_callback(_queued.discard)
+
+
+async def _run_job(job):
+    """Apply one job chunk by chunk; False if it was re-queued meanwhile"""
+    char_id = job['_id']
+    generation = job.get('generation', 0)
+    fields = job.get('fields') or {}
+    update = {'$set': {f'characters.$[c].{field}': value for field, value in fields.items()}}
+    last_id = job.get('last_id')
+    chunks = 0
+
+    while True:
+        query = {'characters.id': char_id}
+        if last_id is not None:
+            query['_id'] = {'$gt': last_id}
+        owners = await user_collection.find(query, {'_id': 1, 'id': 1}).sort('_id', 1).limit(CHUNK_SIZE).to_list(length=CHUNK_SIZE)
+        ids = [doc['_id'] for doc in owners]
+
+        if not ids:
+            favorites = {f'favorites.{field}': value for field, value in fields.items()}
+            fans = await user_collection.distinct('id', {'favorites.id': char_id})
+            await user_collection.update_many({'favorites.id': char_id}, {'$set': favorites})
+            for user_id in fans:
+                invalidate_collection_view(user_id)
+            await jobs_collection.update_one(
+                {'_id': char_id, 'generation': generation},
+                {'$set': {'done': True, 'finished_at': time.time()}},
+            )
+            LOGGER.info(f"[PROPAGATION] {char_id} done: {job.get('processed', 0)} owners")
+            return True
+
+        result = await user_collection.update_many(
+            {'_id': {'$gte': ids[0], '$lte': ids[-1]}, 'characters.id': char_id},
+            update,
+            array_filters=[{'c.id': char_id}],
+        )
+        owner_ids = [doc['id'] for doc in owners if 'id' in doc]
+        if TALLIED_FIELDS & fields.keys():
+            await refresh_owners(owner_ids)
+        else:
+            for user_id in owner_ids:
+                invalidate_collection_view(user_id)
+        last_id = ids[-1]
+        saved = await jobs_collection.update_one(
+            {'_id': char_id, 'generation': generation},
+            {'$set': {'last_id': last_id, 'updated_at': time.time()},
+             '$inc': {'processed': len(ids), 'modified': result.modified_count}},
+        )
+        if saved.matched_count == 0:
+            return False
+
+        job['processed'] = job.get('processed', 0) + len(ids)
+        chunks += 1
+        if chunks % PROGRESS_EVERY == 0:
+            LOGGER.info(f"[PROPAGATION] {char_id}: {job['processed']} owners updated")
+        await asyncio.sleep(CHUNK_PAUSE)
+
+
+async def _work():
+    while True:
+        # Cleared before looking so a job queued meanwhile still wakes us
+        _wake.clear()
+        try:
+            job = await jobs_collection.find_one({'done': False}, sort=[('queued_at', 1)])
+            if job is None:
+                await _wake.wait()
+                continue
+            await _run_job(job)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            LOGGER.error(f"[PROPAGATION ERROR] {e}")
+            await asyncio.sleep(RETRY_PAUSE)
+
+
+async def get_propagation_jobs(limit=10):
+    """Unfinished jobs, oldest first"""
+    cursor = jobs_collection.find({'done': False}).sort('queued_at', 1).limit(limit)
+    return await cursor.to_list(length=limit)
+
+
+def start_propagation():
+    """Resume unfinished jobs and keep applying new ones in the background"""
+    global _worker
+    if _worker is None or _worker.done():
+        _worker = asyncio.create_task(_work())
+
+
+def stop_propagation():
+    global _worker
+    if _worker is not None:
+        _worker.cancel()
+        _worker = None
+
+
+add_edit_listener(_on_catalog_edit)
@@ -0,0 +1,83 @@
+"""
+Rank lookups for /sinfo.
+Keeps a sorted snapshot of every user's character count and wealth
+(wallet + bank), rebuilt in the background every few minutes. A rank is a
+binary search of the user's live value in that snapshot, so it costs the
+same no matter how many users there are.
+"""
+
+import asyncio
+import time
+from bisect import bisect_right
+
+from shivu import user_collection, LOGGER
+from shivu.modules.database.ownership import stats_ready
+from shivu.modules.database.user_stats import stats_collection
+
+REFRESH_INTERVAL = 600
+
+_char_counts = []
+_wealth = []
+_built_at = None
+_refresh_lock = asyncio.Lock()
+_refresher = None
+
+
+async def refresh_ranks():
+    """Rebuild both sorted snapshots"""
+    global _char_counts, _wealth, _built_at
+    async with _refresh_lock:
+        wealth_expr = {'$add': [{'$ifNull': ['$balance', 0]}, {'$ifNull': ['$bank', 0]}]}
+        use_stats = await stats_ready()
+
+        project = {'_id': 0, 'w': wealth_expr}
+        if not use_stats:
+            project['c'] = {'$cond': {'if': {'$isArray': '$characters'}, 'then': {'$size': '$characters'}, 'else': 0}}
+
+        wealth, counts = [], []
+        async for doc in user_collection.aggregate([{'$project': project}]):
+            w = doc.get('w')
+            wealth.append(w if isinstance(w, (int, float)) else 0)
+            if not use_stats:
+                counts.append(doc.get('c', 0))
+
+        if use_stats:
+            async for doc in stats_collection.find({}, {'_id': 0, 'total': 1}):
+                counts.append(doc.get('total', 0))
+
+        wealth.sort()
+        counts.sort()
+        _wealth, _char_counts = wealth, counts
+        _built_at = time.monotonic()
+        LOGGER.info(f"Rank snapshot rebuilt: {len(wealth)} users")
+
+
+async def _refresh_in_background():
+    try:
+        await refresh_ranks()
+    except Exception as e:
+        LOGGER.error(f"Error rebuilding rank snapshot: {e}")
+
+
+async def _ensure_fresh():
+    global _refresher
+    if _built_at is None:
+        await refresh_ranks()
+    elif time.monotonic() - _built_at > REFRESH_INTERVAL and (_refresher is None or _refresher.done()):
+        # Serve the current snapshot while a new one is built
+        _refresher = asyncio.create_task(_refresh_in_background())
+
+
+def _rank(values, value):
+    """1 + number of snapshot entries strictly above value"""
+    return len(values) - bisect_right(values, value) + 1
+
+
+async def get_char_rank(char_count):
+    await _ensure_fresh()
+    return _rank(_char_counts, char_count)
+
+
+async def get_wealth_rank(wealth):
+    await _ensure_fresh()
+    return _rank(_wealth, wealth)
@@ -0,0 +1,149 @@
+"""
+Maintenance resync of embedded character copies with the catalog (/solve).
+Streams users in _id order, compares each owned copy with the in-memory
+catalog and writes only what is stale: one UpdateOne per user that sets the
+differing fields through arrayFilters, so copies granted meanwhile are never
+overwritten. Batches go out as unordered bulk_writes with a bounded number
+in flight; the checkpoint only advances past batches that were written, so
+an interrupted run resumes where it stopped. Users whose copies changed
+then go through ownership.refresh_owners, which re-tallies their user_stats
+and drops their cached collection and harem views.
+"""
+
+import asyncio
+import time
+from collections import deque
+
+from pymongo import ASCENDING, UpdateOne
+
+from shivu import user_collection, LOGGER
+from shivu.modules.database.catalog import ensure_catalog, get_character
+from shivu.modules.database.ownership import migrations_collection, refresh_owners
+from shivu.modules.database.propagation import PROPAGATED_FIELDS
+
+RESYNC_ID = 'resync_characters'
+RESYNC_BATCH = 500
+RESYNC_CONCURRENCY = 4
+RESYNC_PAUSE = 0.1
+
+_resync_lock = asyncio.Lock()
+
+
+def _stale_fields(characters):
+    """character_id -> {field: catalog value} for copies that differ from the catalog"""
+    stale = {}
+    for char in characters or []:
+        if not isinstance(char, dict):
+            continue
+        char_id = char.get('id')
+        if char_id in stale:
+            continue
+        current = get_character(char_id)
+        if current is None:
+            continue
+        changed = {
+            field: current[field] for field in PROPAGATED_FIELDS
+            if field in current and char.get(field) != current[field]
+        }
+        if changed:
+            stale[char_id] = changed
+    return stale
+
+
+def _resync_op(user):
+    stale = _stale_fields(user.get('characters'))
+    if not stale:
+        return None, 0
+    update, array_filters = {}, []
+    for i, (char_id, changed) in enumerate(stale.items()):
+        for field, value in changed.items():
+            update[f'characters.$[c{i}].{field}'] = value
+        array_filters.append({f'c{i}.id': char_id})
+    return UpdateOne({'_id': user['_id']}, {'$set': update}, array_filters=array_filters), len(stale)
+
+
+async def get_resync_state():
+    return await migrations_collection.find_one({'_id': RESYNC_ID}) or {}
+
+
+async def _save(state):
+    await migrations_collection.update_one(
+        {'_id': RESYNC_ID},
+        {'$set': {**state, 'updated_at': time.time()}},
+        upsert=True
+    )
+
+
+async def resync_characters(dry_run=False, restart=False, batch_size=RESYNC_BATCH,
+                            concurrency=RESYNC_CONCURRENCY, pause=RESYNC_PAUSE):
+    """
+    Bring every user's copies up to date with the catalog. A dry run walks
+    all users without writing anything or touching the checkpoint. Returns
+    {'processed', 'users_changed', 'characters_changed', 'done'}.
+    """
+    async with _resync_lock:
+        await ensure_catalog()
+        state = {} if dry_run else await get_resync_state()
+        if restart or state.get('done'):
+            state = {}
+
+        last_id = state.get('last_id')
+        totals = {key: state.get(key, 0) for key in ('processed', 'users_changed', 'characters_changed')}
+        in_flight = deque()
+
+        async def settle(task, batch_last_id, counts):
+            await task
+            for key, n in counts.items():
+                totals[key] += n
+            if not dry_run:
+                await _save({'last_id': batch_last_id, 'done': False, **totals})
+
+        projection = {'_id': 1, 'id': 1, 'characters.id': 1}
+        projection.update({f'characters.{field}': 1 for field in PROPAGATED_FIELDS})
+        query = {'_id': {'$gt': last_id}} if last_id else {}
+        cursor = user_collection.find(query, projection).sort('_id', ASCENDING).batch_size(batch_size)
+
+        batch = []
+        try:
+            async for user in cursor:
+                batch.append(user)
+                if len(batch) < batch_size:
+                    continue
+                in_flight.append(_submit(batch, dry_run))
+                batch = []
+                if len(in_flight) >= concurrency:
+                    await settle(*in_flight.popleft())
+                    LOGGER.info(f"Resync{' (dry run)' if dry_run else ''}: {totals['processed']} users")
+                    await asyncio.sleep(pause)
+            if batch:
+                in_flight.append(_submit(batch, dry_run))
+            while in_flight:
+                await settle(*in_flight.popleft())
+        finally:
+            # Batches after a failed one stay behind the checkpoint and are redone on resume
+            for task, _, _ in in_flight:
+                task.cancel()
+
+        totals['done'] = True
+        if not dry_run:
+            await _save({'last_id': None, **totals})
+        return totals
+
+
+def _submit(users, dry_run):
+    """Start writing one batch; (task, last _id, counts) for settle()"""
+    ops, changed_users, characters_changed = [], [], 0
+    for user in users:
+        op, stale = _resync_op(user)
+        if op is not None:
+            ops.append(op)
+            changed_users.append(user.get('id'))
+            characters_changed += stale
+    counts = {'processed': len(users), 'users_changed': len(ops), 'characters_changed': characters_changed}
+
+    async def write():
+        if ops and not dry_run:
+            await user_collection.bulk_write(ops, ordered=False)
+            await refresh_owners(user_id for user_id in changed_users if user_id is not None)
+
+    return asyncio.create_task(write()), users[-1]['_id'], counts
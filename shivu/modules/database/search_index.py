@@ -0,0 +1,291 @@
+"""
+In-memory text search for inline queries.
+TextIndex normalizes each entry's name, anime, id and rarity (NFKC +
+casefold, collapsed whitespace) and indexes them two ways:
+
+- a sorted list of (token, key) holding each field and each word of it,
+  so exact and prefix matches are a bisect away;
+- optional trigram posting sets, so a substring query only verifies the
+  entries that contain all of its trigrams (without them, or for queries
+  shorter than a trigram, substring matches scan the normalized text).
+
+Results are ranked exact > prefix > substring, then by name, and each tier
+is only computed when the previous ones did not fill the limit.
+
+The global catalog indexes (all fields for inline search, names only for
+/find) are built in a worker thread after every snapshot load and swapped
+in; until the first build lands, queries scan the snapshot. They then
+follow it through add_catalog_listener and cache ranked lists per (catalog
+version, query), so inline pagination is a slice of the cached list. search_anime matches against the snapshot's anime -> members
+map the same way.
+"""
+
+import asyncio
+import unicodedata
+from bisect import bisect_left, insort
+
+from cachetools import LRUCache
+
+from shivu import LOGGER
+from shivu.modules.database.catalog import (
+    add_catalog_listener,
+    add_load_listener,
+    get_all_characters,
+    get_anime_members,
+    get_catalog_version,
+    get_character_at,
+    get_character_index,
+)
+
+FIELDS = ('name', 'anime', 'id', 'rarity')
+MAX_RESULTS = 500
+
+
+def normalize(text):
+    text = unicodedata.normalize('NFKC', str(text or '')).casefold()
+    return ' '.join(text.split())
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _doc_tokens(fields):
+    tokens = set(fields)
+    for value in fields:
+        tokens.update(value.split())
+    tokens.discard('')
+    return tokens
+
+
+class TextIndex:
+    """Ranked substring search over character dicts, keyed by any sortable key"""
+
+    def __init__(self, trigrams=True, fields=FIELDS):
+        self.trigrams = trigrams
+        self.fields = fields
+        self._fields = {}
+        self._texts = {}
+        self._names = {}
+        self._postings = {}
+        self._tokens = []
+
+    def __len__(self):
+        return len(self._fields)
+
+    def clear(self):
+        for store in (self._fields, self._texts, self._names, self._postings):
+            store.clear()
+        self._tokens.clear()
+
+    def _doc_trigrams(self, fields):
+        grams = set()
+        if self.trigrams:
+            for value in fields:
+                grams |= _trigrams(value)
+        return grams
+
+    def remove(self, key):
+        fields = self._fields.pop(key, None)
+        if fields is None:
+            return
+        self._texts.pop(key, None)
+        self._names.pop(key, None)
+        for gram in self._doc_trigrams(fields):
+            posting = self._postings.get(gram)
+            if posting is not None:
+                posting.discard(key)
+                if not posting:
+                    del self._postings[gram]
+        for token in _doc_tokens(fields):
+            pos = bisect_left(self._tokens, (token, key))
+            if pos < len(self._tokens) and self._tokens[pos] == (token, key):
+                del self._tokens[pos]
+
+    def add(self, key, char, sort_tokens=True):
+        """Index (or re-index) one character; pass sort_tokens=False in bulk, then call finish()"""
+        self.remove(key)
+        fields = tuple(normalize(char.get(field, '')) for field in self.fields)
+        self._fields[key] = fields
+        # NUL keeps a substring test from matching across two fields
+        self._texts[key] = '\0'.join(fields)
+        self._names[key] = fields[0]
+        for gram in self._doc_trigrams(fields):
+            self._postings.setdefault(gram, set()).add(key)
+        for token in _doc_tokens(fields):
+            if sort_tokens:
+                insort(self._tokens, (token, key))
+            else:
+                self._tokens.append((token, key))
+
+    def finish(self):
+        self._tokens.sort()
+
+    def _token_matches(self, needle):
+        """(exact, prefix) key sets from the sorted token list"""
+        tokens = self._tokens
+        exact, prefix = set(), set()
+        pos = bisect_left(tokens, (needle,))
+        while pos < len(tokens) and tokens[pos][0].startswith(needle):
+            token, key = tokens[pos]
+            (exact if token == needle else prefix).add(key)
+            pos += 1
+        return exact, prefix - exact
+
+    def _substring_matches(self, needle):
+        if not self.trigrams or len(needle) < 3:
+            return {key for key, text in self._texts.items() if needle in text}
+        postings = sorted((self._postings.get(gram, ()) for gram in _trigrams(needle)), key=len)
+        if not postings[0]:
+            return set()
+        return {key for key in set(postings[0]).intersection(*postings[1:]) if needle in self._texts[key]}
+
+    def search(self, needle, limit=MAX_RESULTS):
+        """Ranked keys matching an already normalized needle"""
+        exact, prefix = self._token_matches(needle)
+        ranked = sorted(exact, key=self._names.__getitem__)
+        if len(ranked) < limit:
+            ranked += sorted(prefix, key=self._names.__getitem__)
+        if len(ranked) < limit:
+            seen = exact | prefix
+            ranked += sorted(self._substring_matches(needle) - seen, key=self._names.__getitem__)
+        return ranked[:limit]
+
+
+# ==================== GLOBAL CATALOG INDEX ====================
+
+_catalog_index = TextIndex()
+_name_index = TextIndex(fields=('name',))
+_built = False
+_results = LRUCache(maxsize=2000)
+_build_task = None
+# Characters stored or dropped while a build runs, applied to it before the swap
+_missed = {}
+
+
+def _apply(indexes, idx, char):
+    for index in indexes:
+        if char is None:
+            index.remove(idx)
+        else:
+            index.add(idx, char)
+
+
+def _on_catalog_change(idx, char):
+    if _build_task is not None:
+        _missed[idx] = char
+    if _built:
+        _apply((_catalog_index, _name_index), idx, char)
+
+
+def _build(entries):
+    """Fresh (catalog, name) indexes over (idx, char) pairs; runs in a worker thread"""
+    indexes = (TextIndex(), TextIndex(fields=('name',)))
+    for idx, char in entries:
+        for index in indexes:
+            index.add(idx, char, sort_tokens=False)
+    for index in indexes:
+        index.finish()
+    return indexes
+
+
+async def build_index():
+    """Index the whole catalog snapshot off the event loop, then swap it in"""
+    global _catalog_index, _name_index, _built
+    entries = []
+    for char in get_all_characters():
+        idx = get_character_index(char.get('id'))
+        if idx is not None:
+            entries.append((idx, char))
+    _missed.clear()
+    indexes = await asyncio.get_running_loop().run_in_executor(None, _build, entries)
+    for idx, char in _missed.items():
+        _apply(indexes, idx, char)
+    _missed.clear()
+    _catalog_index, _name_index = indexes
+    _results.clear()
+    _built = True
+
+
+async def _build_in_background():
+    global _build_task
+    try:
+        await build_index()
+    except Exception as e:
+        LOGGER.error(f"Error building search index: {e}")
+    finally:
+        _build_task = None
+
+
+def _on_catalog_load():
+    global _build_task
+    if _build_task is None:
+        _build_task = asyncio.create_task(_build_in_background())
+
+
+def _scan(fields, needle, limit):
+    results = []
+    for char in get_all_characters():
+        if any(needle in normalize(char.get(field, '')) for field in fields):
+            results.append(char)
+            if len(results) >= limit:
+                break
+    return results
+
+
+def _search(index, scope, query, limit):
+    needle = normalize(query)
+    if not needle:
+        return []
+    if not _built:
+        # The index is built after the catalog loads; until then, scan
+        return _scan(index.fields, needle, limit)
+
+    cache_key = (scope, get_catalog_version(), needle, limit)
+    cached = _results.get(cache_key)
+    if cached is not None:
+        return cached
+
+    results = []
+    for idx in index.search(needle, limit):
+        char = get_character_at(idx)
+        if char is not None:
+            results.append(char)
+    _results[cache_key] = results
+    return results
+
+
+def search_characters(query, limit=MAX_RESULTS):
+    """Ranked catalog characters matching query in any indexed field"""
+    return _search(_catalog_index, 'all', query, limit)
+
+
+def search_names(query, limit=MAX_RESULTS):
+    """Ranked catalog characters whose name matches query"""
+    return _search(_name_index, 'name', query, limit)
+
+
+def search_anime(query):
+    """Characters of every anime whose title contains query, closest titles first"""
+    needle = normalize(query)
+    if not needle:
+        return []
+
+    cache_key = ('anime', get_catalog_version(), needle)
+    cached = _results.get(cache_key)
+    if cached is not None:
+        return cached
+
+    matches = []
+    for anime, members in get_anime_members().items():
+        title = normalize(anime)
+        if needle in title:
+            matches.append(((title != needle, not title.startswith(needle), title), members))
+    matches.sort(key=lambda match: match[0])
+    results = [char for _, members in matches for char in members]
+    _results[cache_key] = results
+    return results
+
+
+add_catalog_listener(_on_catalog_change)
+add_load_listener(_on_catalog_load)
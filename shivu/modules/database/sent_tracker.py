@@ -0,0 +1,63 @@
+"""
+Per-chat "already spawned" tracking.
+Each chat keeps a bitset over catalog indices plus a sent count per rarity
+pool, so spawns can tell which pools still have fresh characters and draw
+from them without building lists. Trackers live on the chat's ChatState, so
+an evicted chat simply starts a new rotation.
+"""
+
+import random
+
+_DRAW_ATTEMPTS = 8
+
+
+class SentTracker:
+    __slots__ = ('bits', 'counts', 'version')
+
+    def __init__(self):
+        self.bits = bytearray()
+        self.counts = {}
+        self.version = -1
+
+    def has(self, idx):
+        byte = idx >> 3
+        return byte < len(self.bits) and bool(self.bits[byte] & (1 << (idx & 7)))
+
+    def add(self, idx, emoji):
+        if self.has(idx):
+            return
+        byte = idx >> 3
+        if byte >= len(self.bits):
+            self.bits.extend(bytes(byte + 1 - len(self.bits)))
+        self.bits[byte] |= 1 << (idx & 7)
+        self.counts[emoji] = self.counts.get(emoji, 0) + 1
+
+    def clear(self):
+        self.bits = bytearray()
+        self.counts = {}
+
+    def sync(self, pools, version):
+        """Recount per-pool sent totals after the catalog changed"""
+        if self.version == version:
+            return
+        self.counts = {}
+        if self.bits:
+            for emoji, pool in pools.items():
+                sent = sum(1 for idx in pool if self.has(idx))
+                if sent:
+                    self.counts[emoji] = sent
+        self.version = version
+
+    def unsent(self, emoji, pool):
+        return len(pool) - self.counts.get(emoji, 0)
+
+    def draw(self, pool, rng=random):
+        """Uniform pick among the pool's indices that were not sent yet"""
+        for _ in range(_DRAW_ATTEMPTS):
+            idx = pool[int(rng.random() * len(pool))]
+            if not self.has(idx):
+                return idx
+        # Pool is mostly used up, pick among what is left
+        fresh = [idx for idx in pool if not self.has(idx)]
+        return rng.choice(fresh) if fresh else None
+
@@ -0,0 +1,97 @@
+"""
+Weighted rarity sampler for spawns.
+Keeps one Walker/Vose alias table per chat so a spawn draw is O(1); the table
+is rebuilt only when the weighted rarity list for that chat changes (rarity
+settings, group exclusive or which rarity pools have characters left).
+"""
+
+import random
+
+from cachetools import LRUCache
+
+_tables = LRUCache(maxsize=20000)
+
+
+class AliasTable:
+    """Walker/Vose alias table over (key, weight) pairs"""
+
+    __slots__ = ('keys', 'weights', 'total', '_prob', '_alias')
+
+    def __init__(self, items):
+        self.keys = [key for key, _ in items]
+        self.weights = [max(float(weight), 0.0) for _, weight in items]
+        n = len(self.keys)
+        total = self.total = sum(self.weights)
+        self._prob = [1.0] * n
+        self._alias = list(range(n))
+
+        if n == 0 or total <= 0:
+            return
+
+        scaled = [w * n / total for w in self.weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            self._prob[s] = scaled[s]
+            self._alias[s] = l
+            scaled[l] = (scaled[l] + scaled[s]) - 1.0
+            if scaled[l] < 1.0:
+                small.append(l)
+            else:
+                large.append(l)
+
+        # Leftovers are 1.0 up to float error
+        for i in large + small:
+            self._prob[i] = 1.0
+
+    def draw(self, rng=random):
+        if not self.keys:
+            return None
+        # Same as the old cumulative roll when every weight is zero
+        if self.total <= 0:
+            return self.keys[0]
+        i = int(rng.random() * len(self.keys))
+        if rng.random() < self._prob[i]:
+            return self.keys[i]
+        return self.keys[self._alias[i]]
+
+
+def build_weighted_choices(pool_emojis, global_rarities, group_setting=None):
+    """
+    Ordered (emoji, chance, is_exclusive) list for a chat.
+    The group exclusive comes first with its own chance, then every globally
+    enabled rarity that still has characters in the pool.
+    """
+    choices = []
+    exclusive_emoji = group_setting['rarity_emoji'] if group_setting else None
+
+    if exclusive_emoji and exclusive_emoji in pool_emojis:
+        choices.append((exclusive_emoji, group_setting.get('chance', 10.0), True))
+
+    for emoji, rarity_data in global_rarities.items():
+        if not rarity_data.get('enabled', True):
+            continue
+        if emoji == exclusive_emoji:
+            continue
+        if emoji in pool_emojis:
+            choices.append((emoji, rarity_data.get('chance', 5.0), False))
+
+    return tuple(choices)
+
+
+def pick_rarity(chat_id, pool_emojis, global_rarities, group_setting=None, rng=random):
+    """Draw a rarity for a chat; returns (emoji, chance, is_exclusive) or None"""
+    choices = build_weighted_choices(pool_emojis, global_rarities, group_setting)
+    if not choices:
+        return None
+
+    cached = _tables.get(chat_id)
+    if cached is None or cached[0] != choices:
+        cached = (choices, AliasTable([(choice, choice[1]) for choice in choices]))
+        _tables[chat_id] = cached
+
+    return cached[1].draw(rng)
+
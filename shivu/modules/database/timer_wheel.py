@@ -0,0 +1,76 @@
+"""
+Hashed timer wheel.
+One background task advances the wheel every tick and fires due callbacks,
+instead of keeping one sleeping task per pending timer. Timers are keyed so
+they can be replaced or cancelled.
+"""
+
+import asyncio
+import math
+
+from shivu import LOGGER
+
+
+class TimerWheel:
+    def __init__(self, tick=1.0, slots=512):
+        self.tick = tick
+        self.slots = [{} for _ in range(slots)]
+        self.position = 0
+        self._timers = {}
+        self._task = None
+        # Strong references to firing callbacks; the loop only keeps weak ones
+        self._firing = set()
+
+    def __len__(self):
+        return len(self._timers)
+
+    def schedule(self, key, delay, callback, *args):
+        """Run callback(*args) (a coroutine function) after delay seconds"""
+        self.cancel(key)
+        ticks = max(1, math.ceil(delay / self.tick))
+        slot = (self.position + ticks) % len(self.slots)
+        rounds = (ticks - 1) // len(self.slots)
+        self.slots[slot][key] = [rounds, callback, args]
+        self._timers[key] = slot
+
+    def cancel(self, key):
+        slot = self._timers.pop(key, None)
+        if slot is not None:
+            self.slots[slot].pop(key, None)
+
+    def _advance(self):
+        self.position = (self.position + 1) % len(self.slots)
+        bucket = self.slots[self.position]
+        for key, entry in list(bucket.items()):
+            if entry[0] > 0:
+                entry[0] -= 1
+                continue
+            del bucket[key]
+            self._timers.pop(key, None)
+            task = asyncio.create_task(self._fire(key, entry[1], entry[2]))
+            self._firing.add(task)
+            task.add_done_callback(self._firing.discard)
+
+    async def _fire(self, key, callback, args):
+        try:
+            await callback(*args)
+        except Exception as e:
+            LOGGER.error(f"Timer {key} failed: {e}")
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            next_tick += self.tick
+            # Catch up without drifting if the loop was busy
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+            self._advance()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
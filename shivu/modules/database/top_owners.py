@@ -0,0 +1,90 @@
+"""
+Top owners of a character for the owners/grabbers lists.
+Only the k biggest holders leave the database, with id, name and count:
+from the ownership store (character_id + count + user_id index) once it is ready,
+otherwise from an aggregation that counts copies server-side. Results are
+cached briefly per character and dropped when one of its owners changes.
+"""
+
+from cachetools import TTLCache
+
+from shivu import user_collection
+from shivu.modules.database.ownership import add_ownership_listener, ownership_collection, ownership_ready
+
+TOP_OWNERS_TTL = 60
+TOP_OWNERS_LIMIT = 10
+
+_cache = TTLCache(maxsize=1000, ttl=TOP_OWNERS_TTL)
+
+
+async def _from_ownership_store(character_id, limit):
+    rows = await ownership_collection.find(
+        {'character_id': character_id, 'count': {'$gt': 0}},
+        {'_id': 0, 'user_id': 1, 'count': 1},
+    ).sort([('count', -1), ('user_id', 1)]).limit(limit).to_list(length=limit)
+    if not rows:
+        return []
+
+    names = {}
+    cursor = user_collection.find(
+        {'id': {'$in': [row['user_id'] for row in rows]}},
+        {'_id': 0, 'id': 1, 'first_name': 1, 'username': 1},
+    )
+    async for user in cursor:
+        names[user['id']] = user
+
+    owners = []
+    for row in rows:
+        user = names.get(row['user_id'], {})
+        owners.append({
+            'id': row['user_id'],
+            'first_name': user.get('first_name'),
+            'username': user.get('username'),
+            'count': row['count'],
+        })
+    return owners
+
+
+async def _from_user_documents(character_id, limit):
+    pipeline = [
+        {'$match': {'characters.id': character_id}},
+        {'$project': {
+            '_id': 0,
+            'id': 1,
+            'first_name': 1,
+            'username': 1,
+            'count': {'$size': {'$filter': {
+                'input': '$characters',
+                'as': 'c',
+                'cond': {'$eq': ['$$c.id', character_id]},
+            }}},
+        }},
+        {'$match': {'count': {'$gt': 0}}},
+        {'$sort': {'count': -1, 'id': 1}},
+        {'$limit': limit},
+    ]
+    return await user_collection.aggregate(pipeline, allowDiskUse=True).to_list(length=limit)
+
+
+async def get_top_owners(character_id, limit=TOP_OWNERS_LIMIT):
+    """[{'id', 'first_name', 'username', 'count'}] for the biggest holders, most copies first"""
+    key = (character_id, limit)
+    owners = _cache.get(key)
+    if owners is None:
+        if await ownership_ready():
+            owners = await _from_ownership_store(character_id, limit)
+        else:
+            owners = await _from_user_documents(character_id, limit)
+        _cache[key] = owners
+    return owners
+
+
+def _on_ownership_change(user_id, copies, gained, lost):
+    if not _cache:
+        return
+    changed = set(copies) | set(gained) | set(lost)
+    for key in [key for key in _cache.keys() if key[0] in changed]:
+        _cache.pop(key, None)
+
+
+add_ownership_listener(_on_ownership_change)
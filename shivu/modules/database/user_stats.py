@@ -0,0 +1,110 @@
+"""
+Denormalized per-user collection counters (user_stats collection).
+One document per user: total copies, unique characters, and copies per
+rarity and per anime. The ownership hooks keep it current with a single
+atomic update per change, so profile and harem rendering never walk the
+characters array.
+
+Rarity and anime names are used as field names, so '.' and a leading '$'
+are swapped for their fullwidth forms (stat_key / _unkey). They are taken
+from the live catalog, so when a character's rarity or anime is edited its
+owners are re-tallied (ownership.refresh_owners) rather than leaving
+increments under the old key and decrements under the new one.
+"""
+
+from collections import Counter
+
+from shivu import db, LOGGER
+from shivu.modules.database.catalog import get_character
+
+stats_collection = db['user_stats']
+
+
+def stat_key(value):
+    key = str(value or 'Unknown').replace('.', '．')
+    return '＄' + key[1:] if key.startswith('$') else key
+
+
+def _unkey(key):
+    key = key.replace('．', '.')
+    return '$' + key[1:] if key.startswith('＄') else key
+
+
+def _fields_of(char):
+    """(rarity, anime) of an owned copy, preferring the live catalog"""
+    char_id = char.get('id') if isinstance(char, dict) else char
+    catalog = get_character(char_id) or {}
+    source = char if isinstance(char, dict) else {}
+    rarity = catalog.get('rarity', source.get('rarity', '🟢 Common'))
+    anime = catalog.get('anime', source.get('anime', 'Unknown'))
+    return rarity, anime
+
+
+def tally(characters):
+    """(copies per id, copies per rarity key, copies per anime key)"""
+    by_id, by_rarity, by_anime = Counter(), Counter(), Counter()
+    for char in characters or []:
+        char_id = char.get('id') if isinstance(char, dict) else char
+        if char_id is None:
+            continue
+        rarity, anime = _fields_of(char)
+        by_id[char_id] += 1
+        by_rarity[stat_key(rarity)] += 1
+        by_anime[stat_key(anime)] += 1
+    return by_id, by_rarity, by_anime
+
+
+async def add_stats(user_id, total, unique, by_rarity, by_anime, sign=1):
+    """Atomically shift a user's counters (sign=-1 for removals)"""
+    inc = {}
+    if total:
+        inc['total'] = sign * total
+    if unique:
+        inc['unique'] = sign * unique
+    for key, n in by_rarity.items():
+        inc[f'by_rarity.{key}'] = sign * n
+    for key, n in by_anime.items():
+        inc[f'by_anime.{key}'] = sign * n
+    if not inc:
+        return
+    try:
+        await stats_collection.update_one({'user_id': user_id}, {'$inc': inc}, upsert=True)
+    except Exception as e:
+        LOGGER.error(f"Error updating stats for {user_id}: {e}")
+
+
+async def set_stats(user_id, by_id, by_rarity, by_anime):
+    """Overwrite a user's counters from a full tally"""
+    try:
+        await stats_collection.update_one(
+            {'user_id': user_id},
+            {'$set': {
+                'total': sum(by_id.values()),
+                'unique': len(by_id),
+                'by_rarity': dict(by_rarity),
+                'by_anime': dict(by_anime),
+            }},
+            upsert=True
+        )
+    except Exception as e:
+        LOGGER.error(f"Error setting stats for {user_id}: {e}")
+
+
+def _clean(counts):
+    return {_unkey(key): n for key, n in (counts or {}).items() if n > 0}
+
+
+def format_stats(total, unique, by_rarity, by_anime):
+    return {
+        'total': max(total or 0, 0),
+        'unique': max(unique or 0, 0),
+        'by_rarity': _clean(by_rarity),
+        'by_anime': _clean(by_anime),
+    }
+
+
+async def read_stats(user_id):
+    doc = await stats_collection.find_one({'user_id': user_id}, {'_id': 0})
+    if not doc:
+        return None
+    return format_stats(doc.get('total'), doc.get('unique'), doc.get('by_rarity'), doc.get('by_anime'))
@@ -0,0 +1,87 @@
+"""
+Projection-aware reads of user documents.
+Handlers ask for a named view (profile, wallet, pass, store, collection)
+instead of the whole document, so showing a balance no longer transfers a
+heavy collector's character array.
+
+UserRepository memoizes reads for the lifetime of one update: repeated
+reads of the same user are served from memory, and a wider view fetches
+only once. user_repo(context) returns the repository attached to the
+update's CallbackContext (PTB builds one context per update).
+"""
+
+from shivu import user_collection
+
+PROJECTIONS = {
+    'profile': frozenset({
+        'id', 'username', 'first_name', 'balance', 'tokens', 'user_xp',
+        'referred_users', 'referred_by',
+    }),
+    'wallet': frozenset({
+        'id', 'balance', 'bank', 'tokens', 'user_xp', 'last_daily', 'last_interest',
+        'loan_amount', 'loan_due_date', 'notifications', 'permanent_debt',
+    }),
+    'pass': frozenset({'id', 'balance', 'tokens', 'pass_data'}),
+    'store': frozenset({'id', 'balance', 'private_store', 'characters.id', 'characters._id'}),
+    'collection': frozenset({'id', 'username', 'first_name', 'characters', 'favorites'}),
+    'harem': frozenset({'id', 'first_name', 'characters', 'favorites', 'smode'}),
+}
+
+
+def _fields(view):
+    if isinstance(view, str):
+        return PROJECTIONS[view]
+    return frozenset(view)
+
+
+def _projection(fields):
+    # A full 'characters' already covers 'characters.id'; Mongo rejects both
+    projection = {'_id': 0}
+    for field in fields:
+        parent = field.split('.', 1)[0]
+        if parent != field and parent in fields:
+            continue
+        projection[field] = 1
+    return projection
+
+
+async def fetch_user(user_id, view='profile'):
+    """Read one view of a user document (no memo)"""
+    return await user_collection.find_one({'id': user_id}, _projection(_fields(view)))
+
+
+class UserRepository:
+    """Per-update memo of user reads"""
+
+    __slots__ = ('_docs',)
+
+    def __init__(self):
+        self._docs = {}
+
+    async def get(self, user_id, view='profile'):
+        fields = _fields(view)
+        cached = self._docs.get(user_id)
+        if cached is not None:
+            cached_fields, doc = cached
+            if fields <= cached_fields:
+                return doc
+            fields = fields | cached_fields
+        doc = await user_collection.find_one({'id': user_id}, _projection(fields))
+        self._docs[user_id] = (fields, doc)
+        return doc
+
+    def forget(self, user_id=None):
+        """Drop memoized reads after a write"""
+        if user_id is None:
+            self._docs.clear()
+        else:
+            self._docs.pop(user_id, None)
+
+
+def user_repo(context):
+    """UserRepository bound to the current update's context"""
+    repo = getattr(context, '_user_repo', None)
+    if repo is None:
+        repo = UserRepository()
+        context._user_repo = repo
+    return repo
@@ -3,6 +3,7 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import CommandHandler, CallbackContext, CallbackQueryHandler
 
 from shivu import application, user_collection, LOGGER
+from shivu.modules.database.collection_views import invalidate_collection_view
 
 
 async def fav(update: Update, context: CallbackContext) -> None:
@@ -106,6 +107,7 @@ async def handle_fav_callback(update: Update, context: CallbackContext) -> None:
                 {'id': user_id},
                 {'$set': {'favorites': character}}
             )
+            invalidate_collection_view(user_id)
 
             if result.matched_count == 0:
                 await query.answer("Failed to update!", show_alert=True)
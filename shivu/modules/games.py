@@ -6,6 +6,7 @@ from telegram.ext import CommandHandler, CallbackQueryHandler
 from telegram import InlineKeyboardMarkup, InlineKeyboardButton, Update
 from telegram.ext import CallbackContext
 from shivu import application, user_collection
+from shivu.modules.database.users import fetch_user
 import random
 import time
 
@@ -33,7 +34,7 @@ def user_on_cooldown(user_id: int) -> (bool, float):
     return True, GAME_COOLDOWN_SECONDS - elapsed
 
 async def get_user_doc(user_id: int):
-    doc = await user_collection.find_one({'id': user_id})
+    doc = await fetch_user(user_id, 'profile')
     return doc
 
 async def ensure_user_doc(user_id: int, first_name=None, username=None):
@@ -99,8 +100,7 @@ async def sbet(update: Update, context: CallbackContext):
     else:
         guess = 'tails'
 
-    await ensure_user_doc(user_id, update.effective_user.first_name, update.effective_user.username)
-    user = await get_user_doc(user_id)
+    user = await ensure_user_doc(user_id, update.effective_user.first_name, update.effective_user.username)
     balance = user.get('balance', 0)
 
     if balance < amount:
@@ -146,8 +146,7 @@ async def roll_cmd(update: Update, context: CallbackContext):
         return
     choice = 'odd' if choice.startswith('o') else 'even'
 
-    await ensure_user_doc(user_id, update.effective_user.first_name, update.effective_user.username)
-    user = await get_user_doc(user_id)
+    user = await ensure_user_doc(user_id, update.effective_user.first_name, update.effective_user.username)
     if user.get('balance', 0) < amount:
         await update.message.reply_text("Not enough coins.")
         return
@@ -184,8 +183,7 @@ async def gamble(update: Update, context: CallbackContext):
         return
     pick = 'l' if pick.startswith('l') else 'r'
 
-    await ensure_user_doc(user_id, update.effective_user.first_name, update.effective_user.username)
-    user = await get_user_doc(user_id)
+    user = await ensure_user_doc(user_id, update.effective_user.first_name, update.effective_user.username)
     if user.get('balance', 0) < amount:
         await update.message.reply_text("Not enough coins.")
         return
@@ -221,8 +219,7 @@ async def basket(update: Update, context: CallbackContext):
         await update.message.reply_text("Usage: /basket <amount>")
         return
 
-    await ensure_user_doc(user_id, update.effective_user.first_name, update.effective_user.username)
-    user = await get_user_doc(user_id)
+    user = await ensure_user_doc(user_id, update.effective_user.first_name, update.effective_user.username)
     if user.get('balance', 0) < amount:
         await update.message.reply_text("Not enough coins.")
         return
@@ -255,8 +252,7 @@ async def dart(update: Update, context: CallbackContext):
         await update.message.reply_text("Usage: /dart <amount>")
         return
 
-    await ensure_user_doc(user_id, update.effective_user.first_name, update.effective_user.username)
-    user = await get_user_doc(user_id)
+    user = await ensure_user_doc(user_id, update.effective_user.first_name, update.effective_user.username)
     if user.get('balance', 0) < amount:
         await update.message.reply_text("Not enough coins.")
         return
@@ -288,8 +284,7 @@ async def stour(update: Update, context: CallbackContext):
         await update.message.reply_text("⌛ Wait a few seconds before trying again.")
         return
 
-    await ensure_user_doc(user_id, update.effective_user.first_name, update.effective_user.username)
-    user = await get_user_doc(user_id)
+    user = await ensure_user_doc(user_id, update.effective_user.first_name, update.effective_user.username)
 
     entry_fee = 300  # cost to play
 
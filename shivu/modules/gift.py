@@ -2,6 +2,7 @@ import traceback
 from telegram import InlineKeyboardMarkup, InlineKeyboardButton, Update
 from telegram.ext import CommandHandler, CallbackContext, CallbackQueryHandler
 from shivu import application, user_collection, LOGGER
+from shivu.modules.database.ownership import record_grant, record_revoke
 
 pending_gifts = {}
 
@@ -145,6 +146,7 @@ async def handle_gift_callback(update: Update, context: CallbackContext):
                     {'id': user_id},
                     {'$pull': {'characters': {'id': character['id']}}}
                 )
+                await record_revoke(user_id, [character['id']], all_copies=True)
 
                 if receiver:
                     await user_collection.update_one(
@@ -158,6 +160,7 @@ async def handle_gift_callback(update: Update, context: CallbackContext):
                         'first_name': gift_data['receiver_first_name'],
                         'characters': [character]
                     })
+                await record_grant(gift_data['receiver_id'], [character])
 
                 success_msg = (
                     f"Gift Successful!\n\n"
@@ -1,22 +1,20 @@
 from pyrogram import Client, filters
-from shivu import db, collection, top_global_groups_collection, group_user_totals_collection, user_collection, user_totals_collection
+from shivu import db, collection, top_global_groups_collection, group_user_totals_collection, user_totals_collection
 import asyncio
-from shivu import user_collection, collection, application
+from shivu import collection, application
 from shivu import sudo_users
 from shivu import shivuu as app
 from telegram import InlineKeyboardMarkup, InlineKeyboardButton, Update
 from shivu.modules.database.sudo import is_user_sudo
+from shivu.modules.database.ownership import grant_character
 from telegram.ext import CommandHandler, CallbackContext, CallbackQueryHandler
 
-async def give_character(receiver_id, character_id):
+async def give_character(receiver_id, character_id, username=None, first_name=None):
     character = await collection.find_one({'id': character_id})
 
     if character:
         try:
-            await user_collection.update_one(
-                {'id': receiver_id},
-                {'$push': {'characters': character}}
-            )
+            await grant_character(receiver_id, character, username=username, first_name=first_name)
 
             img_url = character['img_url']
             caption = (
@@ -52,10 +50,11 @@ async def give_character_command(update: Update, context: CallbackContext):
     try:
         # Split the message to get the character ID
         character_id = str(message.text.split()[1])
-        receiver_id = message.reply_to_message.from_user.id
+        receiver = message.reply_to_message.from_user
+        receiver_id = receiver.id
 
         # Call the function to give the character
-        result = await give_character(receiver_id, character_id)
+        result = await give_character(receiver_id, character_id, receiver.username, receiver.first_name)
 
         if result:
             # If successful, send the photo and caption
@@ -4,6 +4,10 @@ from html import escape
 import random
 import math
 from shivu import db, application
+from shivu.modules.database.file_ids import send_character_photo
+from shivu.modules.database.catalog import ensure_catalog, get_anime_totals
+from shivu.modules.database.ownership import get_user_stats
+from shivu.modules.database.collection_views import get_harem_view, invalidate_collection_view
 
 # Database collections
 collection = db['anime_characters_lol']
@@ -40,43 +44,27 @@ async def harem(update: Update, context: CallbackContext, page=0, edit=False) ->
     user_id = update.effective_user.id
 
     try:
-        user = await user_collection.find_one({'id': user_id})
-        if not user:
+        view = await get_harem_view(user_id)
+        if not view:
             message = update.message or update.callback_query.message
             await message.reply_text("You need to grab a character first using /grab command!")
             return
 
-        characters = user.get('characters', [])
-        if not characters:
+        if not view.characters:
             message = update.message or update.callback_query.message
             await message.reply_text("You don't have any characters yet! Use /grab to catch some.")
             return
 
         # Get favorite character - FIXED: favorites is now a dict, not an ID
-        fav_character = user.get('favorites', None)
-
-        # Validate favorite character
-        if fav_character and not isinstance(fav_character, dict):
-            fav_character = None
+        fav_character = view.favorite
 
         # Get harem mode
-        hmode = user.get('smode', 'default')
+        hmode = view.mode
 
-        # Filter characters based on mode
-        if hmode == "default" or hmode is None:
-            filtered_chars = [char for char in characters if isinstance(char, dict)]
-            rarity_filter = "All"
-        else:
-            rarity_value = HAREM_MODE_MAPPING.get(hmode, None)
-            if rarity_value:
-                filtered_chars = [
-                    char for char in characters 
-                    if isinstance(char, dict) and char.get('rarity') == rarity_value
-                ]
-                rarity_filter = rarity_value
-            else:
-                filtered_chars = [char for char in characters if isinstance(char, dict)]
-                rarity_filter = "All"
+        # Filtered, sorted and counted once per (user, mode); pages are slices
+        rarity_value = None if hmode in ("default", None) else HAREM_MODE_MAPPING.get(hmode, None)
+        rarity_filter = rarity_value or "All"
+        filtered_chars, character_counts = view.sorted_characters(rarity_value)
 
         if not filtered_chars:
             message = update.message or update.callback_query.message
@@ -86,16 +74,6 @@ async def harem(update: Update, context: CallbackContext, page=0, edit=False) ->
             )
             return
 
-        # Sort characters
-        filtered_chars = sorted(filtered_chars, key=lambda x: (x.get('anime', ''), x.get('id', '')))
-
-        # Count characters
-        character_counts = {}
-        for char in filtered_chars:
-            char_id = char.get('id')
-            if char_id:
-                character_counts[char_id] = character_counts.get(char_id, 0) + 1
-
         # Pagination
         total_pages = math.ceil(len(filtered_chars) / 10)
         if page < 0 or page >= total_pages:
@@ -126,16 +104,16 @@ async def harem(update: Update, context: CallbackContext, page=0, edit=False) ->
 
         # Track included characters to avoid duplicates
         included = set()
+        user_anime_counts = view.anime_counts
+        await ensure_catalog()
+        anime_totals = get_anime_totals()
 
         for anime, chars in grouped.items():
             # Count user's characters from this anime
-            user_anime_count = len([
-                c for c in user['characters'] 
-                if isinstance(c, dict) and c.get('anime') == anime
-            ])
+            user_anime_count = user_anime_counts.get(anime, 0)
 
             # Count total characters in this anime
-            total_anime_count = await collection.count_documents({"anime": anime})
+            total_anime_count = anime_totals.get(anime, 0)
 
             harem_message += f'<b>➥ {anime} [{user_anime_count}/{total_anime_count}]</b>\n'
 
@@ -200,18 +178,19 @@ async def harem(update: Update, context: CallbackContext, page=0, edit=False) ->
         message = update.message or update.callback_query.message
 
         # FIXED: Determine which image to show - favorite always takes priority
-        display_img = None
+        display_char = None
 
         # Priority 1: Show favorite if it exists and has an image
         if fav_character and fav_character.get('img_url'):
-            display_img = fav_character['img_url']
+            display_char = fav_character
         # Priority 2: Show random character from filtered list
         elif filtered_chars:
             random_char = random.choice(filtered_chars)
-            display_img = random_char.get('img_url')
+            if random_char.get('img_url'):
+                display_char = random_char
 
         # Send or edit message
-        if display_img:
+        if display_char:
             if edit:
                 await message.edit_caption(
                     caption=harem_message, 
@@ -219,8 +198,9 @@ async def harem(update: Update, context: CallbackContext, page=0, edit=False) ->
                     parse_mode='HTML'
                 )
             else:
-                await message.reply_photo(
-                    photo=display_img,
+                await send_character_photo(
+                    message.reply_photo,
+                    display_char,
                     caption=harem_message,
                     reply_markup=reply_markup,
                     parse_mode='HTML'
@@ -295,8 +275,9 @@ async def unfav(update: Update, context: CallbackContext) -> None:
         ]
         reply_markup = InlineKeyboardMarkup(buttons)
 
-        await update.message.reply_photo(
-            photo=fav_character.get("img_url", ""),
+        await send_character_photo(
+            update.message.reply_photo,
+            fav_character,
             caption=(
                 f"<b>💔 ᴅᴏ ʏᴏᴜ ᴡᴀɴᴛ ᴛᴏ ʀᴇᴍᴏᴠᴇ ᴛʜɪs ғᴀᴠᴏʀɪᴛᴇ?</b>\n\n"
                 f"✨ <b>ɴᴀᴍᴇ:</b> <code>{fav_character.get('name', 'Unknown')}</code>\n"
@@ -348,6 +329,7 @@ async def handle_unfav_callback(update: Update, context: CallbackContext) -> Non
                 {'id': user_id},
                 {'$unset': {'favorites': ""}}
             )
+            invalidate_collection_view(user_id)
 
             if result.matched_count == 0:
                 await query.answer("❌ ғᴀɪʟᴇᴅ ᴛᴏ ᴜᴘᴅᴀᴛᴇ!", show_alert=True)
@@ -461,6 +443,7 @@ async def mode_button(update: Update, context: CallbackContext) -> None:
                 {'id': user_id}, 
                 {'$set': {'smode': 'default'}}
             )
+            invalidate_collection_view(user_id)
             await query.answer("✅ Mode set to Default")
             await query.edit_message_caption(
                 caption="<b>✅ Display Mode Updated</b>\n\nShowing: <b>All Characters</b>",
@@ -494,6 +477,7 @@ async def mode_button(update: Update, context: CallbackContext) -> None:
                 {'id': user_id}, 
                 {'$set': {'smode': mode_name}}
             )
+            invalidate_collection_view(user_id)
             await query.answer(f"✅ Mode set to {rarity_display}")
             await query.edit_message_caption(
                 caption=f"<b>✅ Display Mode Updated</b>\n\nShowing: <b>{rarity_display}</b>",
@@ -510,9 +494,10 @@ async def mode_button(update: Update, context: CallbackContext) -> None:
 async def handle_char_count_info(update: Update, context: CallbackContext) -> None:
     """Handle character count info button"""
     query = update.callback_query
+    stats = await get_user_stats(query.from_user.id)
     await query.answer(
-        "📊 Total: All characters you own\n"
-        "🎯 Unique: Different characters (no duplicates)",
+        f"📊 Total: {stats['total']} (all characters you own)\n"
+        f"🎯 Unique: {stats['unique']} (no duplicates)",
         show_alert=True
     )
 
@@ -3,6 +3,7 @@ from datetime import datetime, timedelta
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import CommandHandler, CallbackContext
 from shivu import application, user_collection, collection, LOGGER
+from shivu.modules.database.ownership import record_grant
 import random
 
 claim_lock = {}
@@ -85,6 +86,7 @@ async def hclaim(update: Update, context: CallbackContext):
                 '$set': {'last_daily_claim': datetime.utcnow(), 'first_name': first_name, 'username': username}
             }
         )
+        await record_grant(user_id, [char])
 
         event = f"\n🎪 ᴇᴠᴇɴᴛ: <b>{char['event']['name']}</b>" if char.get('event', {}).get('name') else ""
         origin = f"\n🌍 ᴏʀɪɢɪɴ: <b>{char['origin']}</b>" if char.get('origin') else ""
@@ -1,7 +1,8 @@
 import random
 from telegram import InlineKeyboardMarkup, InlineKeyboardButton, Update
 from telegram.ext import CommandHandler, CallbackContext, CallbackQueryHandler
-from shivu import application, user_collection
+from shivu import application
+from shivu.modules.database.users import fetch_user
 
 VIDEOS = [
     "https://files.catbox.moe/25ntg5.mp4",
@@ -22,7 +23,7 @@ TIPS = [
 
 async def get_balance(user_id):
     try:
-        user = await user_collection.find_one({'id': user_id})
+        user = await fetch_user(user_id, 'wallet')
         return user.get('balance', 0) if user else 0
     except:
         return 0
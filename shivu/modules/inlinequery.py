@@ -1,4 +1,3 @@
-import re
 import time
 from html import escape
 from cachetools import TTLCache
@@ -18,6 +17,11 @@ from telegram.ext import (
 
 # Your own imports
 from shivu import application, db, LOGGER
+from shivu.modules.database.collection_views import get_collection_view
+from shivu.modules.database.catalog import ensure_catalog, get_anime_totals
+from shivu.modules.database.global_counts import get_owner_counts, get_copy_count
+from shivu.modules.database.search_index import search_characters
+from shivu.modules.database.top_owners import get_top_owners
 
 # Database collections
 collection = db['anime_characters_lol']
@@ -37,8 +41,6 @@ except Exception as e:
 
 # Caches
 all_characters_cache = TTLCache(maxsize=10000, ttl=36000)
-user_collection_cache = TTLCache(maxsize=10000, ttl=60)
-character_count_cache = TTLCache(maxsize=10000, ttl=300)
 
 # Small caps conversion function
 def to_small_caps(text):
@@ -55,36 +57,6 @@ def to_small_caps(text):
     return ''.join(small_caps_map.get(c, c) for c in text)
 
 
-async def get_global_count(character_id: str) -> int:
-    """Get global grab count with caching"""
-    cache_key = f"global_{character_id}"
-    if cache_key in character_count_cache:
-        return character_count_cache[cache_key]
-
-    try:
-        count = await user_collection.count_documents({'characters.id': character_id})
-        character_count_cache[cache_key] = count
-        return count
-    except Exception as e:
-        print(f"Error getting global count: {e}")
-        return 0
-
-
-async def get_anime_count(anime_name: str) -> int:
-    """Get total characters in anime with caching"""
-    cache_key = f"anime_{anime_name}"
-    if cache_key in character_count_cache:
-        return character_count_cache[cache_key]
-
-    try:
-        count = await collection.count_documents({'anime': anime_name})
-        character_count_cache[cache_key] = count
-        return count
-    except Exception as e:
-        print(f"Error getting anime count: {e}")
-        return 0
-
-
 # Inline query handler
 async def inlinequery(update: Update, context) -> None:
     """Handle inline queries for character search"""
@@ -93,8 +65,7 @@ async def inlinequery(update: Update, context) -> None:
 
     # Determine which characters to fetch
     all_characters = []
-    user = None
-    user_id = None
+    view = None
 
     try:
         if query.startswith('collection.'):
@@ -104,71 +75,15 @@ async def inlinequery(update: Update, context) -> None:
             search_terms = parts[1] if len(parts) > 1 else ''
 
             if user_id.isdigit():
-                user_id_int = int(user_id)
-
-                # Get user from cache or database
-                if user_id in user_collection_cache:
-                    user = user_collection_cache[user_id]
-                else:
-                    user = await user_collection.find_one({'id': user_id_int})
-                    if user:
-                        user_collection_cache[user_id] = user
-
-                if user:
-                    # Get unique characters from user's collection
-                    characters_dict = {}
-                    for c in user.get('characters', []):
-                        if isinstance(c, dict) and c.get('id'):
-                            characters_dict[c.get('id')] = c
-                    all_characters = list(characters_dict.values())
-
-                    # Get favorite character - handle both dict and string
-                    favorite_char_data = user.get('favorites')
-                    favorite_char = None
-
-                    if favorite_char_data:
-                        if isinstance(favorite_char_data, dict):
-                            # Favorite is stored as character object
-                            favorite_char = favorite_char_data
-                            LOGGER.info(f"[INLINE] Favorite is dict: {favorite_char.get('name')}")
-                        elif isinstance(favorite_char_data, str):
-                            # Favorite is stored as character ID
-                            favorite_char = next(
-                                (c for c in all_characters if c.get('id') == favorite_char_data),
-                                None
-                            )
-                            LOGGER.info(f"[INLINE] Favorite is string ID, found: {favorite_char.get('name') if favorite_char else 'None'}")
-
-                    # If no search terms and user has favorite, show favorite FIRST
-                    if not search_terms and favorite_char:
-                        LOGGER.info(f"[INLINE] Moving favorite to first position: {favorite_char.get('name')}")
-                        # Remove favorite from list if it exists
-                        all_characters = [c for c in all_characters if c.get('id') != favorite_char.get('id')]
-                        # Insert at beginning
-                        all_characters.insert(0, favorite_char)
-
-                    # Apply search filter
-                    if search_terms:
-                        regex = re.compile(search_terms, re.IGNORECASE)
-                        all_characters = [
-                            c for c in all_characters 
-                            if regex.search(c.get('name', '')) 
-                            or regex.search(c.get('rarity', '')) 
-                            or regex.search(c.get('id', '')) 
-                            or regex.search(c.get('anime', ''))
-                        ]
+                # Prepared view: unique characters, counts and token index
+                view = await get_collection_view(int(user_id))
+                if view:
+                    all_characters = view.search(search_terms)
         else:
             # Global character search
             if query:
-                regex = re.compile(re.escape(query), re.IGNORECASE)
-                all_characters = await collection.find({
-                    "$or": [
-                        {"name": regex}, 
-                        {"rarity": regex}, 
-                        {"id": regex}, 
-                        {"anime": regex}
-                    ]
-                }).to_list(length=200)
+                await ensure_catalog()
+                all_characters = search_characters(query)
             else:
                 # Get all characters
                 if 'all_characters' in all_characters_cache:
@@ -182,6 +97,13 @@ async def inlinequery(update: Update, context) -> None:
         has_more = len(all_characters) > offset + 50
         next_offset = str(offset + 50) if has_more else ""
 
+        # One batched lookup for the whole page
+        if view is None:
+            owner_counts = await get_owner_counts([c.get('id') for c in characters])
+        else:
+            await ensure_catalog()
+            anime_totals = get_anime_totals()
+
         results = []
         for character in characters:
             char_id = character.get('id')
@@ -203,23 +125,17 @@ async def inlinequery(update: Update, context) -> None:
                 rarity_text = 'Common'
 
             # Check if this is user's favorite
-            is_favorite = False
-            if user and user.get('favorites'):
-                fav = user.get('favorites')
-                if isinstance(fav, dict) and fav.get('id') == char_id:
-                    is_favorite = True
-                elif isinstance(fav, str) and fav == char_id:
-                    is_favorite = True
+            is_favorite = view is not None and view.is_favorite(char_id)
 
             # Build caption based on query type
-            if query.startswith('collection.') and user:
+            if query.startswith('collection.') and view:
                 # User collection caption
-                user_character_count = sum(1 for c in user.get('characters', []) if c.get('id') == char_id)
-                user_anime_count = sum(1 for c in user.get('characters', []) if c.get('anime') == char_anime)
-                anime_total = await get_anime_count(char_anime)
+                user_character_count = view.copies.get(char_id, 0)
+                user_anime_count = view.anime_counts.get(char_anime, 0)
+                anime_total = anime_totals.get(char_anime, 0)
 
-                user_first_name = user.get('first_name', 'User')
-                user_id_int = user.get('id')
+                user_first_name = view.first_name
+                user_id_int = view.user_id
 
                 # Add favorite indicator
                 fav_indicator = "💖 " if is_favorite else ""
@@ -236,7 +152,7 @@ async def inlinequery(update: Update, context) -> None:
                     caption += f"\n\n💖 <b>{to_small_caps('favorite character')}</b>"
             else:
                 # Global search caption
-                global_count = await get_global_count(char_id)
+                global_count = owner_counts.get(char_id, 0)
 
                 caption = (
                     f"<b>🔮 {to_small_caps('look at this waifu')}</b>\n\n"
@@ -296,41 +212,11 @@ async def show_smashers_callback(update: Update, context) -> None:
             await query.answer(to_small_caps("character not found"), show_alert=True)
             return
 
-        # Get all users who have this character
-        users_with_char = await user_collection.find({
-            'characters.id': character_id
-        }).to_list(length=None)
-
-        if not users_with_char:
-            await query.answer(to_small_caps("no one has grabbed this character yet"), show_alert=True)
-            return
-
-        # Count characters for each user and sort
-        user_counts = []
-        for user in users_with_char:
-            user_id = user.get('id')
-            first_name = user.get('first_name', 'User')
-            username = user.get('username')
-
-            # Count how many times this user has this character
-            count = sum(1 for char in user.get('characters', []) if char.get('id') == character_id)
-
-            if count > 0:
-                user_counts.append({
-                    'id': user_id,
-                    'first_name': first_name,
-                    'username': username,
-                    'count': count
-                })
-
-        # Sort by count descending
-        user_counts.sort(key=lambda x: x['count'], reverse=True)
-
-        # Get top 10
-        top_users = user_counts[:10]
+        # Top 10 holders, counted server-side
+        top_users = await get_top_owners(character_id, limit=10)
 
         if not top_users:
-            await query.answer(to_small_caps("no grabbers found"), show_alert=True)
+            await query.answer(to_small_caps("no one has grabbed this character yet"), show_alert=True)
             return
 
         # Build top grabbers list
@@ -338,7 +224,7 @@ async def show_smashers_callback(update: Update, context) -> None:
         for i, user_data in enumerate(top_users, 1):
             user_id = user_data.get('id')
             count = user_data.get('count', 0)
-            first_name = user_data.get('first_name', 'User')
+            first_name = user_data.get('first_name') or 'User'
             username = user_data.get('username')
 
             # Build user link with mention
@@ -360,7 +246,7 @@ async def show_smashers_callback(update: Update, context) -> None:
             grabbers_list.append(f"{medal} {user_link} <b>x{count}</b>")
 
         # Get total global count
-        total_grabbed = sum(u['count'] for u in user_counts)
+        total_grabbed = await get_copy_count(character_id)
 
         smasher_text = (
             f"\n\n<b>🏆 {to_small_caps('top 10 grabbers')}</b>\n"
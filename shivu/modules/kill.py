@@ -3,6 +3,7 @@ from telegram import Update
 from telegram.ext import CommandHandler, CallbackContext
 
 from shivu import application, user_collection, LOGGER
+from shivu.modules.database.ownership import record_replace
 
 OWNER_ID = 8420981179
 
@@ -59,6 +60,7 @@ async def kill(update: Update, context: CallbackContext) -> None:
             {'id': target_user_id},
             {'$set': {'characters': []}}
         )
+        await record_replace(target_user_id, [])
 
         if result.modified_count > 0:
             char_list = "\n".join(character_details[:10])
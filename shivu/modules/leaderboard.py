@@ -10,6 +10,8 @@ from shivu import (application, PHOTO_URL, OWNER_ID,
                     group_user_totals_collection)
 
 from shivu import sudo_users as SUDO_USERS 
+from shivu.modules.database.exports import export_cursor
+from shivu.modules.database.leaderboards import get_top_users, get_top_groups, get_top_chat_users
 
 photo = [
     "https://te.legra.ph/file/f95fff0ab4d886b9e7886.jpg",
@@ -20,26 +22,30 @@ photo = [
 ]
     
 import random
+
+
+def _updated_ago(age):
+    """Snapshot age line shown under each leaderboard"""
+    minutes = int(age // 60)
+    if minutes < 1:
+        return "Updated just now"
+    return f"Updated {minutes} min ago"
+
   
 async def global_leaderboard(update: Update, context: CallbackContext) -> None:
-    cursor = top_global_groups_collection.aggregate([
-        {"$project": {"group_name": 1, "count": 1}},
-        {"$sort": {"count": -1}},
-        {"$limit": 10}
-    ])
-    leaderboard_data = await cursor.to_list(length=10)
+    leaderboard_data, age = await get_top_groups(10)
 
     leaderboard_message = "<b>Top 10 Groups:</b>\n───────────────────\n"
 
     for i, group in enumerate(leaderboard_data, start=1):
-        group_name = html.escape(group.get('group_name', 'Unknown'))
+        group_name = html.escape(group.get('group_name') or 'Unknown')
 
         if len(group_name) > 10:
             group_name = group_name[:15] + '...'
-        count = group['count']
+        count = group.get('count', 0)
         leaderboard_message += f'{i}. <b>{group_name}</b> - {count}\n'
 
-    leaderboard_message += "────────────────────\nTop Groups via @waifukunbot"
+    leaderboard_message += f"────────────────────\n<i>{_updated_ago(age)}</i>\nTop Groups via @waifukunbot"
 
     photo_url = random.choice(photo)
 
@@ -48,26 +54,20 @@ async def global_leaderboard(update: Update, context: CallbackContext) -> None:
 async def ctop(update: Update, context: CallbackContext) -> None:
     chat_id = update.effective_chat.id
 
-    cursor = group_user_totals_collection.aggregate([
-        {"$match": {"group_id": chat_id}},
-        {"$project": {"username": 1, "first_name": 1, "character_count": "$count"}},
-        {"$sort": {"character_count": -1}},
-        {"$limit": 10}
-    ])
-    leaderboard_data = await cursor.to_list(length=10)
+    leaderboard_data, age = await get_top_chat_users(chat_id, 10)
 
     leaderboard_message = "<b>Top 10 Users In Chat:</b>\n───────────────────\n"
 
     for i, user in enumerate(leaderboard_data, start=1):
-        username = user.get('username', 'Unknown')
-        first_name = html.escape(user.get('first_name', 'Unknown'))
+        username = user.get('username') or 'Unknown'
+        first_name = html.escape(user.get('first_name') or 'Unknown')
 
         if len(first_name) > 10:
             first_name = first_name[:15] + '...'
-        character_count = user['character_count']
+        character_count = user.get('count', 0)
         leaderboard_message += f'{i}. <a href="https://t.me/{username}"><b>{first_name}</b></a> - {character_count}\n'
 
-    leaderboard_message += "────────────────────\nTop User In Chat via @waifukunbot"
+    leaderboard_message += f"────────────────────\n<i>{_updated_ago(age)}</i>\nTop User In Chat via @waifukunbot"
 
     photo_url = random.choice(photo)
 
@@ -75,67 +75,48 @@ async def ctop(update: Update, context: CallbackContext) -> None:
 
 
 async def leaderboard(update: Update, context: CallbackContext) -> None:
-    # Ensure the characters field exists and is an array
-    cursor = user_collection.aggregate([
-        {"$match": {"characters": {"$exists": True, "$type": "array"}}},
-        {"$project": {"username": 1, "first_name": 1, "character_count": {"$size": "$characters"}}},
-        {"$sort": {"character_count": -1}},
-        {"$limit": 10}
-    ])
-    leaderboard_data = await cursor.to_list(length=10)
+    leaderboard_data, age = await get_top_users(10)
 
     leaderboard_message = "<b>Top 10 Users with most slaves:</b>\n───────────────────\n"
 
     for i, user in enumerate(leaderboard_data, start=1):
-        username = user.get('username', 'Unknown')
-        first_name = html.escape(user.get('first_name', 'Unknown'))
+        username = user.get('username') or 'Unknown'
+        first_name = html.escape(user.get('first_name') or 'Unknown')
 
         if len(first_name) > 10:
             first_name = first_name[:15] + '...'
-        character_count = user['character_count']
+        character_count = user.get('count', 0)
         leaderboard_message += f'{i}. <a href="https://t.me/{username}"><b>{first_name}</b></a> - <b>{character_count}</b>\n'
 
-    leaderboard_message += "────────────────────\nTop 10 Users via @waifukunbot"
+    leaderboard_message += f"────────────────────\n<i>{_updated_ago(age)}</i>\nTop 10 Users via @waifukunbot"
 
     # Make sure you have a list named 'photo' with photo URLs
     photo_url = random.choice(photo)
 
     await update.message.reply_photo(photo=photo_url, caption=leaderboard_message, parse_mode='HTML')
   
+async def _send_export(update: Update, context: CallbackContext, cursor, fields, filename) -> None:
+    path = await export_cursor(cursor, fields)
+    try:
+        with open(path, 'rb') as f:
+            await context.bot.send_document(chat_id=update.effective_chat.id, document=f, filename=filename)
+    finally:
+        os.remove(path)
+
+
 async def send_users_document(update: Update, context: CallbackContext) -> None:
     if str(update.effective_user.id) not in SUDO_USERS:
-        update.message.reply_text('only For Sudo users...')
+        await update.message.reply_text('only For Sudo users...')
         return
-    cursor = user_collection.find({})
-    users = []
-    async for document in cursor:
-        users.append(document)
-    user_list = ""
-    for user in users:
-        user_list += f"{user['first_name']}\n"
-    with open('users.txt', 'w') as f:
-        f.write(user_list)
-    with open('users.txt', 'rb') as f:
-        await context.bot.send_document(chat_id=update.effective_chat.id, document=f)
-    os.remove('users.txt')
+    cursor = user_collection.find({}, {'_id': 0, 'id': 1, 'first_name': 1, 'username': 1})
+    await _send_export(update, context, cursor, ['id', 'first_name', 'username'], 'users.csv.gz')
 
 async def send_groups_document(update: Update, context: CallbackContext) -> None:
     if str(update.effective_user.id) not in SUDO_USERS:
-        update.message.reply_text('Only For Sudo users...')
+        await update.message.reply_text('Only For Sudo users...')
         return
-    cursor = top_global_groups_collection.find({})
-    groups = []
-    async for document in cursor:
-        groups.append(document)
-    group_list = ""
-    for group in groups:
-        group_list += f"{group['group_name']}\n"
-        group_list += "\n"
-    with open('groups.txt', 'w') as f:
-        f.write(group_list)
-    with open('groups.txt', 'rb') as f:
-        await context.bot.send_document(chat_id=update.effective_chat.id, document=f)
-    os.remove('groups.txt')
+    cursor = top_global_groups_collection.find({}, {'_id': 0, 'group_id': 1, 'group_name': 1, 'count': 1})
+    await _send_export(update, context, cursor, ['group_id', 'group_name', 'count'], 'groups.csv.gz')
 
 async def stats(update: Update, context: CallbackContext) -> None:
     OWNER_ID = 8420981179  # Define your OWNER_ID here
@@ -4,6 +4,7 @@ import random
 from telegram import Update
 from telegram.ext import CommandHandler, CallbackContext
 from shivu import application, user_collection, collection
+from shivu.modules.database.ownership import grant_character
 
 # Configuration
 DICE_COOLDOWN = 1800  # 30 minutes
@@ -86,15 +87,7 @@ async def get_unique_chars(user_id, rarities=None):
 async def add_char(user_id, username, first_name, char):
     """Optimized character addition with upsert"""
     try:
-        await user_collection.update_one(
-            {'id': user_id},
-            {
-                '$push': {'characters': char},
-                '$set': {'username': username, 'first_name': first_name},
-                '$setOnInsert': {'balance': 0}
-            },
-            upsert=True
-        )
+        await grant_character(user_id, char, username=username, first_name=first_name, on_insert={'balance': 0})
         return True
     except Exception as e:
         print(f"Error adding character: {e}")
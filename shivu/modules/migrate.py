@@ -0,0 +1,101 @@
+import asyncio
+import traceback
+from telegram import Update
+from telegram.ext import CommandHandler, CallbackContext
+
+from shivu import application, LOGGER
+from shivu.modules.database.ownership import (
+    MIGRATION_ID,
+    STATS_MIGRATION_ID,
+    migrate_ownership,
+    backfill_user_stats,
+    get_migration_state,
+)
+from shivu.modules.database.propagation import get_propagation_jobs
+
+OWNER_ID = 5147822244
+
+# command -> (migration id, runner)
+MIGRATIONS = {
+    'migrateowners': (MIGRATION_ID, migrate_ownership),
+    'backfillstats': (STATS_MIGRATION_ID, backfill_user_stats),
+}
+
+_tasks = {}
+
+
+async def _run(migration_id, runner):
+    try:
+        state = await runner()
+        LOGGER.info(f"[MIGRATION {migration_id}] Finished: {state.get('processed', 0)} users")
+    except Exception as e:
+        LOGGER.error(f"[MIGRATION {migration_id} ERROR] {e}\n{traceback.format_exc()}")
+
+
+async def migrate_command(update: Update, context: CallbackContext) -> None:
+    """Start/resume a backfill or show its progress (Owner only)"""
+    user_id = update.effective_user.id
+
+    if user_id != OWNER_ID:
+        await update.message.reply_text("This command is only for owner!")
+        return
+
+    command = update.message.text.split()[0].lstrip('/').split('@')[0].lower()
+    migration_id, runner = MIGRATIONS[command]
+
+    try:
+        state = await get_migration_state(migration_id)
+        task = _tasks.get(migration_id)
+        running = task is not None and not task.done()
+
+        if context.args and context.args[0].lower() == 'status':
+            status = "done" if state.get('done') else ("running" if running else "paused")
+            await update.message.reply_text(
+                f"{migration_id}: {status}\n"
+                f"Users processed: {state.get('processed', 0)}"
+            )
+            return
+
+        if state.get('done'):
+            await update.message.reply_text(f"{migration_id} already finished.")
+            return
+
+        if running:
+            await update.message.reply_text(f"Already running. Users processed: {state.get('processed', 0)}")
+            return
+
+        _tasks[migration_id] = asyncio.create_task(_run(migration_id, runner))
+        await update.message.reply_text(
+            f"{migration_id} started (resuming after {state.get('processed', 0)} users).\n"
+            f"Use /{command} status to check progress."
+        )
+        LOGGER.info(f"[MIGRATION {migration_id}] Started by {user_id}")
+
+    except Exception as e:
+        LOGGER.error(f"[MIGRATION {migration_id} ERROR] {e}\n{traceback.format_exc()}")
+        await update.message.reply_text(f"Error: {str(e)}")
+
+
+async def propagation_command(update: Update, context: CallbackContext) -> None:
+    """Show pending catalog edit propagation jobs (Owner only)"""
+    if update.effective_user.id != OWNER_ID:
+        await update.message.reply_text("This command is only for owner!")
+        return
+
+    try:
+        jobs = await get_propagation_jobs()
+        if not jobs:
+            await update.message.reply_text("No catalog edits waiting to be propagated.")
+            return
+        lines = [
+            f"{job['_id']} ({', '.join(job.get('fields', {}))}): {job.get('processed', 0)} owners done"
+            for job in jobs
+        ]
+        await update.message.reply_text("Propagating:\n" + "\n".join(lines))
+    except Exception as e:
+        LOGGER.error(f"[PROPAGATION ERROR] {e}\n{traceback.format_exc()}")
+        await update.message.reply_text(f"Error: {str(e)}")
+
+
+application.add_handler(CommandHandler(list(MIGRATIONS), migrate_command, block=False))
+application.add_handler(CommandHandler('propagation', propagation_command, block=False))
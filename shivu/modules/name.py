@@ -1,46 +1,53 @@
+import asyncio
+import traceback
 from pyrogram import Client, filters
-from shivu import user_collection, collection
-from shivu import shivuu as bot
+from shivu import shivuu as bot, LOGGER
+from shivu.modules.database.resync import resync_characters, get_resync_state
+
+OWNER_ID = 5147822244
+
+_task = None
+
+
+def _summary(state):
+    return (
+        f"Users processed: {state.get('processed', 0)}\n"
+        f"Users changed: {state.get('users_changed', 0)}\n"
+        f"Characters fixed: {state.get('characters_changed', 0)}"
+    )
+
+
+async def _run(message, dry_run, restart):
+    try:
+        state = await resync_characters(dry_run=dry_run, restart=restart)
+        title = "Dry run finished (nothing written)" if dry_run else "Resync finished"
+        await message.reply(f"{title}\n{_summary(state)}")
+    except Exception as e:
+        LOGGER.error(f"[SOLVE ERROR] {e}\n{traceback.format_exc()}")
+        await message.reply(f"Resync stopped: {e}\nRun /solve again to resume.")
+
 
 @bot.on_message(filters.command(["solve"]))
 async def update_names(client, message):
-    # Check if the user is authorized
-    if message.from_user.id == 5147822244:
-        print("Starting the update process...")
-
-        try:
-            async for user in user_collection.find():
-                updated_characters = []
-
-                # Iterate over each character and update the name
-                for character in user['characters']:
-                    # Fetch the original character from the same collection
-                    original_character = await collection.find_one({'id': character['id']})
-                    if original_character:
-                        original_name = original_character['name']
-                    else:
-                        original_name = character['name']  # Fallback to current name if not found
-
-                    updated_characters.append({
-                        'id': character['id'],
-                        'name': original_name,  # Update with the original name
-                        'anime': character['anime'],
-                        'img_url': character['img_url'],
-                        'rarity': character['rarity'],
-                        'count': character.get('count', 1)  # Preserve original count or set to 1 if not present
-                    })
-
-                # Update the user's characters in the database
-                result = await user_collection.update_one(
-                    {'id': user['id']},  # Ensure you're using the correct identifier
-                    {'$set': {'characters': updated_characters}}
-                )
-
-                if result.modified_count == 1:
-                    print(f"Names updated successfully for user: {user['id']}")
-                else:
-                    print(f"Name update failed for user: {user['id']}")
-        except Exception as e:
-            print(f"An error occurred: {e}")
-    else:
+    """Resync users' character copies with the catalog: /solve [dry|restart|status]"""
+    global _task
+    if message.from_user.id != OWNER_ID:
         await message.reply("You are not authorized to use this command.")
+        return
+
+    arg = message.command[1].lower() if len(message.command) > 1 else ''
+    running = _task is not None and not _task.done()
+
+    if arg == 'status':
+        state = await get_resync_state()
+        status = "running" if running else ("done" if state.get('done') else "paused")
+        await message.reply(f"Resync: {status}\n{_summary(state)}")
+        return
+
+    if running:
+        await message.reply("Resync is already running. Use /solve status to check progress.")
+        return
+
+    dry_run = arg == 'dry'
+    _task = asyncio.create_task(_run(message, dry_run, restart=arg == 'restart'))
+    await message.reply("Dry run started..." if dry_run else "Resync started...")
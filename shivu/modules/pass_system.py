@@ -3,6 +3,8 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, InputMe
 from telegram.ext import CommandHandler, CallbackContext, CallbackQueryHandler
 from html import escape
 from shivu import application, user_collection, collection, user_totals_collection, LOGGER
+from shivu.modules.database.ownership import record_grant
+from shivu.modules.database.users import fetch_user
 
 OWNER_ID = 5147822244
 
@@ -25,7 +27,7 @@ def to_small_caps(text):
     return ''.join(m.get(c.lower(), c) for c in text)
 
 async def get_or_create_pass_data(user_id: int):
-    user = await user_collection.find_one({'id': user_id})
+    user = await fetch_user(user_id, 'pass')
     if not user:
         user = {'id': user_id, 'characters': [], 'balance': 0}
         await user_collection.insert_one(user)
@@ -62,7 +64,7 @@ async def pass_command(update: Update, context: CallbackContext):
     try:
         tier = await check_and_update_tier(user_id)
         pass_data = await get_or_create_pass_data(user_id)
-        user = await user_collection.find_one({'id': user_id})
+        user = await fetch_user(user_id, 'wallet')
         tier_name = PASS_CONFIG[tier]['name']
         weekly_claims = pass_data.get('weekly_claims', 0)
         streak_count = pass_data.get('streak_count', 0)
@@ -137,6 +139,7 @@ async def pclaim_command(update: Update, context: CallbackContext):
             mythic_chars = await collection.find({'rarity': '🏵 Mythic'}).limit(mythic_chars_count).to_list(length=mythic_chars_count)
             if mythic_chars:
                 await user_collection.update_one({'id': user_id}, {'$push': {'characters': {'$each': mythic_chars}}})
+                await record_grant(user_id, mythic_chars)
                 await user_totals_collection.update_one({'id': user_id}, {'$inc': {'count': len(mythic_chars)}}, upsert=True)
                 premium_msg = f"\n{to_small_caps('bonus')}: {len(mythic_chars)} {to_small_caps('mythic added')}"
         await update.message.reply_text(f"{to_small_caps('claimed')}\n{to_small_caps('reward')}: <code>{reward:,}</code>\n{to_small_caps('claims')}: {new_claims}/6{premium_msg}", parse_mode='HTML')
@@ -160,6 +163,7 @@ async def sweekly_command(update: Update, context: CallbackContext):
             update_data['$push'] = {'characters': mythic_char}
         await user_collection.update_one({'id': user_id}, update_data)
         if mythic_char:
+            await record_grant(user_id, [mythic_char])
             await user_totals_collection.update_one({'id': user_id}, {'$inc': {'count': 1}}, upsert=True)
         char_msg = f"\n{to_small_caps('bonus char')}: {mythic_char.get('name', 'unknown')}" if mythic_char else ""
         await update.message.reply_text(f"{to_small_caps('streak claimed')}\n{to_small_caps('bonus')}: <code>{bonus:,}</code>{char_msg}", parse_mode='HTML')
@@ -187,6 +191,7 @@ async def tasks_command(update: Update, context: CallbackContext):
             mythic_char = await collection.find_one({'rarity': '🏵 Mythic'})
             if mythic_char:
                 await user_collection.update_one({'id': user_id}, {'$push': {'characters': mythic_char}, '$set': {'pass_data.mythic_unlocked': True}})
+                await record_grant(user_id, [mythic_char])
                 await user_totals_collection.update_one({'id': user_id}, {'$inc': {'count': 1}}, upsert=True)
                 mythic_unlocked = True
         mythic_status = to_small_caps('unlocked') if mythic_unlocked else to_small_caps('locked')
@@ -297,6 +302,7 @@ async def approve_elite_command(update: Update, context: CallbackContext):
         activation_bonus = PASS_CONFIG['elite']['activation_bonus']
         mythic_chars = await collection.find({'rarity': '🏵 Mythic'}).limit(5).to_list(length=5)
         await user_collection.update_one({'id': target_user_id}, {'$set': {'pass_data.tier': 'elite', 'pass_data.elite_expires': expires, 'pass_data.pending_elite_payment': None}, '$inc': {'balance': activation_bonus}, '$push': {'characters': {'$each': mythic_chars}}})
+        await record_grant(target_user_id, mythic_chars)
         await user_totals_collection.update_one({'id': target_user_id}, {'$inc': {'count': len(mythic_chars)}}, upsert=True)
         await update.message.reply_text(f"{to_small_caps('elite activated')}\n{to_small_caps('user')}: <code>{target_user_id}</code>\n{to_small_caps('gold')}: <code>{activation_bonus:,}</code>\n{to_small_caps('mythics')}: {len(mythic_chars)}", parse_mode='HTML')
         try:
@@ -3,6 +3,8 @@ from datetime import datetime, timedelta
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update, InputMediaPhoto 
 from telegram.ext import CallbackContext, CommandHandler, CallbackQueryHandler 
 from shivu import application, db, user_collection 
+from shivu.modules.database.ownership import record_grant 
+from shivu.modules.database.users import fetch_user, user_repo 
  
 collection = db['anime_characters_lol'] 
 luv_config_collection = db['luv_config'] 
@@ -42,8 +44,8 @@ async def generate_chars(uid, cfg):
             chars.append(char[0]) 
     return chars 
  
-async def get_luv_data(uid): 
-    user = await user_collection.find_one({"id": uid}) 
+async def get_luv_data(uid, users=None): 
+    user = await (users.get(uid, 'store') if users else fetch_user(uid, 'store')) 
     return user.get('private_store', {'characters': [], 'last_reset': None, 'refresh_count': 0, 'purchased': []}) if user else None 
  
 async def update_luv_data(uid, data): 
@@ -99,14 +101,15 @@ async def build_caption(char, cfg, page, total, luv_data, balance):
 async def luv(update: Update, context: CallbackContext): 
     uid = update.effective_user.id 
     cfg = await get_config() 
-    user = await user_collection.find_one({"id": uid}) 
+    users = user_repo(context) 
+    user = await users.get(uid, 'store') 
  
     if not user: 
         await update.message.reply_text("⊗ ꜱᴛᴀʀᴛ ᴛʜᴇ ʙᴏᴛ ꜰɪʀꜱᴛ! ᴜꜱᴇ /start") 
         return 
  
     balance = user.get('balance', 0) 
-    luv_data = await get_luv_data(uid) 
+    luv_data = await get_luv_data(uid, users) 
  
     cooldown = cfg.get('cooldown_hours', 24) 
     last_reset = luv_data.get('last_reset') 
@@ -165,6 +168,7 @@ async def luv_callback(update: Update, context: CallbackContext):
     uid = q.from_user.id 
     data = q.data 
     cfg = await get_config() 
+    users = user_repo(context) 
  
     async def render_page(page): 
         chars = context.user_data.get('luv_chars', []) 
@@ -174,9 +178,9 @@ async def luv_callback(update: Update, context: CallbackContext):
  
         context.user_data['luv_page'] = page 
         char = chars[page] 
-        user = await user_collection.find_one({"id": uid}) 
+        user = await users.get(uid, 'store') 
         balance = user.get('balance', 0) if user else 0 
-        luv_data = await get_luv_data(uid) 
+        luv_data = await get_luv_data(uid, users) 
  
         caption, img, price, owned = await build_caption(char, cfg, page + 1, len(chars), luv_data, balance) 
         cid = char.get("id") or char.get("_id") 
@@ -212,12 +216,12 @@ async def luv_callback(update: Update, context: CallbackContext):
         await render_page(int(data.split("_")[2])) 
  
     elif data == "luv_refresh": 
-        user = await user_collection.find_one({"id": uid}) 
+        user = await users.get(uid, 'store') 
         if not user: 
             await q.answer("⊗ ᴜꜱᴇʀ ɴᴏᴛ ꜰᴏᴜɴᴅ", show_alert=True) 
             return 
  
-        luv_data = await get_luv_data(uid) 
+        luv_data = await get_luv_data(uid, users) 
         refresh_left = max(0, cfg.get('refresh_limit', 2) - luv_data.get('refresh_count', 0)) 
  
         if refresh_left <= 0: 
@@ -247,8 +251,8 @@ async def luv_callback(update: Update, context: CallbackContext):
         ) 
  
     elif data == "luv_ref_ok": 
-        user = await user_collection.find_one({"id": uid}) 
-        luv_data = await get_luv_data(uid) 
+        user = await users.get(uid, 'store') 
+        luv_data = await get_luv_data(uid, users) 
         cost = cfg.get('refresh_cost', 20000) 
         balance = user.get('balance', 0) 
  
@@ -257,6 +261,7 @@ async def luv_callback(update: Update, context: CallbackContext):
             return 
  
         await user_collection.update_one({"id": uid}, {"$inc": {"balance": -cost}}) 
+        users.forget(uid) 
  
         # Refresh animation 
         await q.edit_message_caption( 
@@ -298,7 +303,7 @@ async def luv_callback(update: Update, context: CallbackContext):
             await q.answer("⊗ ᴄʜᴀʀᴀᴄᴛᴇʀ ɴᴏᴛ ꜰᴏᴜɴᴅ", show_alert=True) 
             return 
  
-        luv_data = await get_luv_data(uid) 
+        luv_data = await get_luv_data(uid, users) 
         if cid in luv_data.get('purchased', []): 
             await q.answer("⊗ ᴀʟʀᴇᴀᴅʏ ᴘᴜʀᴄʜᴀꜱᴇᴅ!", show_alert=True) 
             return 
@@ -330,8 +335,8 @@ async def luv_callback(update: Update, context: CallbackContext):
             await q.answer("⊗ ᴄʜᴀʀᴀᴄᴛᴇʀ ɴᴏᴛ ꜰᴏᴜɴᴅ", show_alert=True) 
             return 
  
-        user = await user_collection.find_one({"id": uid}) 
-        luv_data = await get_luv_data(uid) 
+        user = await users.get(uid, 'store') 
+        luv_data = await get_luv_data(uid, users) 
  
         if cid in luv_data.get('purchased', []): 
             await q.answer("⊗ ᴀʟʀᴇᴀᴅʏ ᴘᴜʀᴄʜᴀꜱᴇᴅ!", show_alert=True) 
@@ -357,6 +362,8 @@ async def luv_callback(update: Update, context: CallbackContext):
         # Purchase 
         await user_collection.update_one({"id": uid},  
                                          {"$inc": {"balance": -price}, "$push": {"characters": char}}) 
+        await record_grant(uid, [char]) 
+        users.forget(uid) 
  
         if 'purchased' not in luv_data: 
             luv_data['purchased'] = [] 
@@ -408,12 +415,13 @@ async def luv_view(update: Update, context: CallbackContext):
  
 async def luv_stats(update: Update, context: CallbackContext): 
     uid = update.effective_user.id 
-    user = await user_collection.find_one({"id": uid}) 
+    users = user_repo(context) 
+    user = await users.get(uid, 'store') 
     if not user: 
         await update.message.reply_text("⊗ ᴜꜱᴇ /start ꜰɪʀꜱᴛ") 
         return 
  
-    luv_data = await get_luv_data(uid) 
+    luv_data = await get_luv_data(uid, users) 
     cfg = await get_config() 
     refresh_left = max(0, cfg.get('refresh_limit', 2) - luv_data.get('refresh_count', 0)) 
  
@@ -7,6 +7,7 @@ from pyrogram.types import InlineKeyboardMarkup, InlineKeyboardButton, CallbackQ
 
 from shivu.config import Development as Config
 from shivu import shivuu, db, user_collection, collection, sudo_users
+from shivu.modules.database.ownership import grant_character
 
 raid_settings_collection = db['raid_settings']
 raid_cooldown_collection = db['raid_cooldown']
@@ -108,7 +109,7 @@ async def add_character_to_user(user_id, character):
             "anime": character.get("anime"), "rarity": char_rarity,
             "img_url": character.get("img_url", "")
         }
-        await user_collection.update_one({"id": user_id}, {"$push": {"characters": char_data}}, upsert=True)
+        await grant_character(user_id, char_data)
     except Exception as e:
         LOGGER.error(f"Error adding character to user: {e}")
 
@@ -1,6 +1,7 @@
 from telegram.ext import CommandHandler
 from random import choices
 from shivu import application, user_collection, collection
+from shivu.modules.database.ownership import record_replace
 
 # Replace OWNER_ID with the actual owner's user ID
 OWNER_ID = 5147822244
@@ -59,6 +60,7 @@ async def giverandom(update, context):
 
         # Update the receiver's waifus
         await user_collection.update_one({'id': receiver_id}, {'$set': {'characters': receiver_waifus}})
+        await record_replace(receiver_id, receiver_waifus)
 
         await update.message.reply_text(f'Successfully gave {waifu_count} random waifus to user {receiver_id}!')
 
@@ -3,6 +3,7 @@ Enhanced rarity.py - Group gets exclusive rarity + all global rarities
 Fixed version with proper spawn logic
 """
 
+import copy
 import traceback
 from telegram import Update
 from telegram.ext import CommandHandler, CallbackContext
@@ -54,42 +55,112 @@ EMOJI_TO_NAME = {
 NAME_TO_EMOJI = {v: k for k, v in EMOJI_TO_NAME.items()}
 
 
+_settings_cache = None
+_exclusive_cache = None
+
+
 async def get_spawn_settings():
-    """Get global spawn settings"""
+    """
+    Get global spawn settings (cached until changed through
+    update_spawn_settings). The result is shared: read it, never mutate it;
+    use _editable_rarities() to change settings.
+    """
+    global _settings_cache
+    if _settings_cache is not None:
+        return _settings_cache
     try:
         settings = await spawn_settings_collection.find_one({'type': 'rarity_control'})
         if not settings:
-            settings = {'type': 'rarity_control', 'rarities': DEFAULT_RARITIES.copy()}
+            settings = {'type': 'rarity_control', 'rarities': copy.deepcopy(DEFAULT_RARITIES)}
             await spawn_settings_collection.insert_one(settings)
+        _settings_cache = settings
         return settings
     except Exception as e:
         LOGGER.error(f"Error getting spawn settings: {e}")
-        return {'type': 'rarity_control', 'rarities': DEFAULT_RARITIES.copy()}
+        return {'type': 'rarity_control', 'rarities': copy.deepcopy(DEFAULT_RARITIES)}
+
+
+async def _editable_rarities():
+    """Private copy of the global rarities, for commands that change them"""
+    settings = await get_spawn_settings()
+    return copy.deepcopy(settings['rarities'])
 
 
 async def update_spawn_settings(rarities):
     """Update global spawn settings"""
+    global _settings_cache
     try:
+        rarities = copy.deepcopy(rarities)
         await spawn_settings_collection.update_one(
             {'type': 'rarity_control'},
             {'$set': {'rarities': rarities}},
             upsert=True
         )
+        _settings_cache = {'type': 'rarity_control', 'rarities': rarities}
         return True
     except Exception as e:
         LOGGER.error(f"Error updating spawn settings: {e}")
+        _settings_cache = None
         return False
 
 
+async def _load_exclusives():
+    """chat_id -> exclusive doc for every group exclusive"""
+    global _exclusive_cache
+    if _exclusive_cache is None:
+        groups = await group_rarity_collection.find({}).to_list(length=None)
+        _exclusive_cache = {g['chat_id']: g for g in groups if 'chat_id' in g}
+    return _exclusive_cache
+
+
+def invalidate_exclusives():
+    """Force the next lookup to reload group exclusives"""
+    global _exclusive_cache
+    _exclusive_cache = None
+
+
 async def get_group_exclusive(chat_id):
     """Get exclusive rarity settings for a specific group"""
     try:
-        return await group_rarity_collection.find_one({'chat_id': chat_id})
+        exclusives = await _load_exclusives()
+        return exclusives.get(chat_id)
     except Exception as e:
         LOGGER.error(f"Error getting group exclusive: {e}")
         return None
 
 
+async def get_exclusivity_map():
+    """rarity emoji -> set of chat ids that own it as an exclusive"""
+    owners = {}
+    try:
+        exclusives = await _load_exclusives()
+        for chat_id, group in exclusives.items():
+            owners.setdefault(group.get('rarity_emoji'), set()).add(chat_id)
+    except Exception as e:
+        LOGGER.error(f"Error building exclusivity map: {e}")
+    return owners
+
+
+async def get_blocked_rarities(chat_id=None):
+    """
+    Rarity emojis that may not spawn in chat_id.
+    A chat always gets its own exclusive, never another group's exclusive,
+    and otherwise follows the global enabled flags.
+    """
+    owners = await get_exclusivity_map()
+    settings = await get_spawn_settings()
+    rarities = settings.get('rarities', {}) if settings else {}
+
+    blocked = {emoji for emoji, data in rarities.items() if not data.get('enabled', True)}
+    if chat_id:
+        for emoji, chats in owners.items():
+            if chat_id in chats:
+                blocked.discard(emoji)
+            else:
+                blocked.add(emoji)
+    return blocked
+
+
 def normalize_chances(rarities):
     """Normalize chances to sum to 100%"""
     enabled = {k: v for k, v in rarities.items() if v['enabled']}
@@ -170,6 +241,7 @@ async def setg_command(update: Update, context: CallbackContext):
             'rarity_emoji': rarity_emoji,
             'chat_id': {'$ne': chat_id}
         })
+        invalidate_exclusives()
 
         # Set for current group
         await group_rarity_collection.update_one(
@@ -183,6 +255,7 @@ async def setg_command(update: Update, context: CallbackContext):
             }},
             upsert=True
         )
+        invalidate_exclusives()
 
         await update.message.reply_text(
             f"✅ Group exclusive set!\n"
@@ -219,6 +292,7 @@ async def unsetg_command(update: Update, context: CallbackContext):
 
         chat_id = int(context.args[0])
         result = await group_rarity_collection.delete_one({'chat_id': chat_id})
+        invalidate_exclusives()
 
         if result.deleted_count > 0:
             await update.message.reply_text(
@@ -315,8 +389,7 @@ async def renable_command(update: Update, context: CallbackContext):
             await update.message.reply_text("❌ Not found!")
             return
 
-        settings = await get_spawn_settings()
-        rarities = settings['rarities']
+        rarities = await _editable_rarities()
 
         if rarities[emoji]['enabled']:
             await update.message.reply_text(f"ℹ️ {emoji} {rarities[emoji]['name']} already enabled")
@@ -345,8 +418,7 @@ async def rdisable_command(update: Update, context: CallbackContext):
             await update.message.reply_text("❌ Not found!")
             return
 
-        settings = await get_spawn_settings()
-        rarities = settings['rarities']
+        rarities = await _editable_rarities()
 
         if not rarities[emoji]['enabled']:
             await update.message.reply_text(f"ℹ️ {emoji} {rarities[emoji]['name']} already disabled")
@@ -380,8 +452,7 @@ async def rchance_command(update: Update, context: CallbackContext):
             await update.message.reply_text("❌ Not found!")
             return
 
-        settings = await get_spawn_settings()
-        rarities = settings['rarities']
+        rarities = await _editable_rarities()
         old = rarities[emoji]['chance']
         rarities[emoji]['chance'] = round(chance, 2)
         await update_spawn_settings(rarities)
@@ -403,8 +474,7 @@ async def rnormalize_command(update: Update, context: CallbackContext):
         if update.effective_user.id != OWNER_ID:
             return
 
-        settings = await get_spawn_settings()
-        rarities = settings['rarities']
+        rarities = await _editable_rarities()
         old = sum(r['chance'] for r in rarities.values() if r['enabled'])
 
         rarities = normalize_chances(rarities)
@@ -423,7 +493,7 @@ async def rreset_command(update: Update, context: CallbackContext):
     try:
         if update.effective_user.id != OWNER_ID:
             return
-        await update_spawn_settings(DEFAULT_RARITIES.copy())
+        await update_spawn_settings(DEFAULT_RARITIES)
         await update.message.reply_text("✅ Reset to default settings!")
     except Exception as e:
         LOGGER.error(f"Error in rreset: {e}")
@@ -445,4 +515,5 @@ try:
 except Exception as e:
     LOGGER.error(f"❌ Failed to register handlers: {e}")
 
-__all__ = ['spawn_settings_collection', 'group_rarity_collection', 'get_spawn_settings', 'get_group_exclusive']
\ No newline at end of file
+__all__ = ['spawn_settings_collection', 'group_rarity_collection', 'get_spawn_settings', 'get_group_exclusive',
+           'get_exclusivity_map', 'get_blocked_rarities']
\ No newline at end of file
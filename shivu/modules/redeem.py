@@ -5,6 +5,7 @@ from datetime import datetime
 from shivu import user_collection, application, collection 
 from shivu import shivuu as app
 from shivu import shivuu as bot
+from shivu.modules.database.ownership import grant_character
 from telegram.constants import ParseMode
 
 # Dictionary to store generated codes and their amounts, and user claims
@@ -136,9 +137,11 @@ async def claimwaifu(client, message):
             waifu = details['waifu']
             
             # Update the user's characters collection
-            await user_collection.update_one(
-                {'id': user_id},
-                {'$push': {'characters': waifu}}
+            await grant_character(
+                user_id,
+                waifu,
+                username=message.from_user.username,
+                first_name=message.from_user.first_name
             )
             
             # Decrement the remaining quantity
@@ -4,6 +4,7 @@ from telegram import Update
 from telegram.ext import CommandHandler, CallbackContext
 
 from shivu import application, collection, LOGGER
+from shivu.modules.database.catalog import refresh_character
 
 OWNER_ID = 5147822244
 
@@ -33,6 +34,7 @@ async def remove_chr(update: Update, context: CallbackContext) -> None:
             {'id': character_id},
             {'$set': {'removed': True, 'removed_at': datetime.now()}}
         )
+        await refresh_character(character_id)
 
         rarity = character.get('rarity', 'Common')
         if isinstance(rarity, str):
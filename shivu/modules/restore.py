@@ -4,6 +4,7 @@ from telegram import Update
 from telegram.ext import CommandHandler, CallbackContext
 
 from shivu import application, collection, LOGGER
+from shivu.modules.database.catalog import refresh_character
 
 OWNER_ID = 5147822244
 
@@ -39,6 +40,7 @@ async def restore_chr(update: Update, context: CallbackContext) -> None:
             {"id": char_id},
             {"$set": {"removed": False, "restored_at": datetime.utcnow()}}
         )
+        await refresh_character(char_id)
 
         await update.message.reply_text(
             f"Successfully restored {char_data.get('name', 'Unknown')} ({char_id}) back into circulation."
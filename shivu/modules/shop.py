@@ -4,6 +4,8 @@ from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update, InputMe
 from telegram.ext import CallbackContext, CommandHandler, CallbackQueryHandler
 
 from shivu import application, db, user_collection, CHARA_CHANNEL_ID, SUPPORT_CHAT
+from shivu.modules.database.ownership import record_grant
+from shivu.modules.database.users import user_repo
 
 collection = db['anime_characters_lol']
 shop_collection = db['shop']
@@ -168,7 +170,7 @@ async def store(update: Update, context: CallbackContext):
 
     char_id = shop_items[page]['id']
     character = await characters_collection.find_one({"id": char_id})
-    user_data = await user_collection.find_one({"id": user_id})
+    user_data = await user_repo(context).get(user_id, 'store')
     caption, img_url, sold_out = build_caption(character, shop_items[page], page + 1, total_pages, user_data)
 
     buttons = []
@@ -205,6 +207,7 @@ async def shop_callback(update: Update, context: CallbackContext):
     await query.answer()
     user_id = query.from_user.id
     data = query.data
+    users = user_repo(context)
 
     # Helper for rendering shop page
     async def render_shop_page(page):
@@ -218,7 +221,7 @@ async def shop_callback(update: Update, context: CallbackContext):
 
         character = await characters_collection.find_one({"id": char_id})
         shop_item = await shop_collection.find_one({"id": char_id})
-        user_data = await user_collection.find_one({"id": user_id})
+        user_data = await users.get(user_id, 'store')
 
         if not character or not shop_item:
             await query.answer("⚠️ Character not found.", show_alert=True)
@@ -278,7 +281,7 @@ async def shop_callback(update: Update, context: CallbackContext):
         char_id = shop_items[page]['id']
         character = await characters_collection.find_one({"id": char_id})
         shop_item = shop_items[page]
-        user_data = await user_collection.find_one({"id": user_id})
+        user_data = await users.get(user_id, 'store')
 
         caption, img_url, sold_out = build_caption(character, shop_item, page + 1, len(shop_items), user_data)
 
@@ -316,7 +319,7 @@ async def shop_callback(update: Update, context: CallbackContext):
 
         shop_item = await shop_collection.find_one({"id": char_id})
         character = await characters_collection.find_one({"id": char_id})
-        user_data = await user_collection.find_one({"id": user_id})
+        user_data = await users.get(user_id, 'store')
 
         limit = shop_item.get("limit", None)
         sold = shop_item.get("sold", 0)
@@ -356,7 +359,7 @@ async def shop_callback(update: Update, context: CallbackContext):
 
         shop_item = await shop_collection.find_one({"id": char_id})
         character = await characters_collection.find_one({"id": char_id})
-        user_data = await user_collection.find_one({"id": user_id})
+        user_data = await users.get(user_id, 'store')
 
         limit = shop_item.get("limit", None)
         sold = shop_item.get("sold", 0)
@@ -397,6 +400,8 @@ async def shop_callback(update: Update, context: CallbackContext):
             },
             upsert=True
         )
+        await record_grant(user_id, [character])
+        users.forget(user_id)
         await shop_collection.update_one(
             {"id": char_id},
             {"$inc": {"sold": 1}}
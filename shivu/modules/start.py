@@ -7,6 +7,7 @@ from telegram.ext import CallbackContext, CallbackQueryHandler, CommandHandler
 
 from shivu import application, SUPPORT_CHAT, BOT_USERNAME, db, GROUP_ID, LOGGER
 from shivu import user_collection, user_totals_collection
+from shivu.modules.database.users import PROJECTIONS, fetch_user, user_repo
 
 # Import tracking function
 from shivu.modules.chatlog import track_bot_start
@@ -31,10 +32,10 @@ def sc(text):
 
 async def process_referral(user_id: int, first_name: str, referring_user_id: int, context: CallbackContext):
     try:
-        referring_user = await user_collection.find_one({"id": referring_user_id})
+        referring_user = await fetch_user(referring_user_id, {'id'})
         if not referring_user or user_id == referring_user_id:
             return False
-        new_user = await user_collection.find_one({"id": user_id})
+        new_user = await fetch_user(user_id, {'id', 'referred_by'})
         if new_user and new_user.get('referred_by'):
             return False
 
@@ -77,7 +78,8 @@ async def start(update: Update, context: CallbackContext) -> None:
         except:
             pass
 
-    user_data = await user_collection.find_one({"id": user_id})
+    users = user_repo(context)
+    user_data = await users.get(user_id, PROJECTIONS['profile'] | {'pass_data.tier'})
     is_new_user = user_data is None
 
     if is_new_user:
@@ -118,7 +120,8 @@ async def start(update: Update, context: CallbackContext) -> None:
             update_fields['pass_data'] = {"tier": "free", "weekly_claims": 0, "tasks": {"invites": 0}}
         if update_fields:
             await user_collection.update_one({"id": user_id}, {"$set": update_fields})
-            user_data = await user_collection.find_one({"id": user_id})
+            users.forget(user_id)
+            user_data = await users.get(user_id, 'profile')
 
     user_balance = user_data.get('balance', 0)
     user_totals = await user_totals_collection.find_one({'id': user_id})
@@ -167,7 +170,7 @@ async def button_callback(update: Update, context: CallbackContext) -> None:
     await query.answer()
 
     user_id = query.from_user.id
-    user_data = await user_collection.find_one({"id": user_id})
+    user_data = await user_repo(context).get(user_id, 'profile')
     if not user_data:
         await query.answer(sc("start bot first"), show_alert=True)
         return
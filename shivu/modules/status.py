@@ -2,6 +2,8 @@ from pyrogram import Client, filters
 from pyrogram.types import Message, InlineKeyboardButton, InlineKeyboardMarkup
 from pyrogram.enums import ParseMode
 from shivu import shivuu, SUPPORT_CHAT, user_collection, collection
+from shivu.modules.database.ownership import get_user_stats
+from shivu.modules.database.ranks import get_char_rank, get_wealth_rank
 import os
 import math
 import asyncio
@@ -20,27 +22,25 @@ PASS_CFG = {
 
 async def get_stats(uid):
     """Get all user stats"""
-    u = await user_collection.find_one({'id': uid})
+    u = await user_collection.find_one({'id': uid}, {'characters': 0})
     if not u:
         return None
     
     # Collection
-    chars = u.get('characters', [])
-    total = len(chars)
-    unique = len(set(c.get('id') for c in chars if isinstance(c, dict) and c.get('id')))
+    stats = await get_user_stats(uid)
+    total = stats['total']
+    unique = stats['unique']
     db_total = await collection.count_documents({})
     completion = (unique / db_total * 100) if db_total > 0 else 0
     
     # Rank
-    pipeline = [{"$project": {"id": 1, "cnt": {"$cond": {"if": {"$isArray": "$characters"}, "then": {"$size": "$characters"}, "else": 0}}}}, {"$sort": {"cnt": -1}}]
-    ranks = await user_collection.aggregate(pipeline).to_list(length=None)
-    rank = next((i+1 for i, r in enumerate(ranks) if r.get('id') == uid), 0)
+    rank = await get_char_rank(total)
     
     # Finance
     wallet = u.get('balance', 0)
     bank = u.get('bank', 0)
     wealth = wallet + bank
-    wealth_rank = await user_collection.count_documents({'$expr': {'$gt': [{'$add': ['$balance', '$bank']}, wealth]}}) + 1
+    wealth_rank = await get_wealth_rank(wealth)
     
     # Loan
     loan = u.get('loan_amount', 0)
@@ -2,6 +2,7 @@ from telegram import InlineKeyboardMarkup, InlineKeyboardButton, Update
 from telegram.ext import CommandHandler, CallbackContext, CallbackQueryHandler
 from shivu import shivuu as bot
 from shivu import user_collection, application
+from shivu.modules.database.ownership import record_replace
 import asyncio
 
 pending_trades = {}
@@ -111,6 +112,8 @@ async def on_callback_query(update: Update, context: CallbackContext):
 
         await user_collection.update_one({'id': sender_id}, {'$set': {'characters': sender['characters']}})
         await user_collection.update_one({'id': receiver_id}, {'$set': {'characters': receiver['characters']}})
+        await record_replace(sender_id, sender['characters'])
+        await record_replace(receiver_id, receiver['characters'])
 
         del pending_trades[(sender_id, receiver_id)]
 
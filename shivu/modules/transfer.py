@@ -1,6 +1,7 @@
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import CommandHandler, CallbackQueryHandler
 from shivu import application, user_collection
+from shivu.modules.database.ownership import record_replace
 
 # Replace OWNER_ID with the actual owner's user ID
 OWNER_ID = 8420981179
@@ -73,6 +74,8 @@ async def transfer_confirm(update, context):
 
             await user_collection.update_one({'id': receiver_id}, {'$set': {'characters': receiver_waifus}})
             await user_collection.update_one({'id': sender_id}, {'$set': {'characters': []}})
+            await record_replace(receiver_id, receiver_waifus)
+            await record_replace(sender_id, [])
 
             await query.edit_message_text('All waifus have been successfully transferred!')
         else:
@@ -13,6 +13,7 @@ from telegram import Update
 from telegram.ext import CommandHandler, ContextTypes
 
 from shivu import application, collection, db, CHARA_CHANNEL_ID, SUPPORT_CHAT, sudo_users
+from shivu.modules.database.catalog import refresh_character, discard_character
 
 
 # Constants
@@ -210,6 +211,7 @@ async def create_character_entry(
         
         character['message_id'] = message.message_id
         await collection.insert_one(character)
+        await refresh_character(char_id)
         
         return True, (
             f'✅ Character added successfully!\n'
@@ -219,6 +221,7 @@ async def create_character_entry(
     except Exception as e:
         # Insert to DB even if channel upload fails
         await collection.insert_one(character)
+        await refresh_character(char_id)
         return False, (
             f"⚠️ Character added to database but channel upload failed.\n\n"
             f"🆔 ID: {char_id}\n"
@@ -397,6 +400,8 @@ async def delete(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         await update.message.reply_text('❌ Character not found in database.')
         return
     
+    discard_character(character['id'])
+    
     # Try to delete from channel
     try:
         await context.bot.delete_message(
@@ -489,6 +494,7 @@ async def update_character(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     
     # Refresh character data
     character = await collection.find_one({'id': char_id})
+    await refresh_character(char_id)
     
     # Update channel message
     is_video_file = character.get('is_video', False)
@@ -544,6 +550,7 @@ async def update_character(update: Update, context: ContextTypes.DEFAULT_TYPE) -
                         'file_unique_id': message.photo[-1].file_unique_id
                     }}
                 )
+            await refresh_character(char_id)
         else:
             # Just update caption for other fields
             await context.bot.edit_message_caption(
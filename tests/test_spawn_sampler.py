@@ -0,0 +1,81 @@
+"""Statistical checks for the spawn alias sampler (shivu/modules/database/spawn_sampler.py)."""
+
+import importlib.util
+import os
+import random
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded by path: importing the shivu package connects to Mongo and Telegram
+_spec = importlib.util.spec_from_file_location(
+    'spawn_sampler', os.path.join(ROOT, 'shivu', 'modules', 'database', 'spawn_sampler.py')
+)
+spawn_sampler = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(spawn_sampler)
+
+DRAWS = 200000
+# chi-square critical values at p = 0.001, by degrees of freedom
+CHI2_CRITICAL = {1: 10.828, 2: 13.816, 3: 16.266, 4: 18.467, 5: 20.515, 7: 24.322}
+
+
+def _chi_square(table, draws, rng):
+    observed = {key: 0 for key in table.keys}
+    for _ in range(draws):
+        observed[table.draw(rng)] += 1
+    total = sum(table.weights)
+    stat = 0.0
+    for key, weight in zip(table.keys, table.weights):
+        expected = draws * weight / total
+        stat += (observed[key] - expected) ** 2 / expected
+    return stat
+
+
+@pytest.mark.parametrize('weights', [
+    [1, 1],
+    [70, 20, 8, 2],
+    [5.0, 5.0, 5.0, 5.0, 5.0],
+    [50, 25, 12.5, 6.25, 3.125, 1.5625],
+    [0.5, 90, 3, 1, 2, 1, 2, 0.5],
+])
+def test_alias_frequencies_match_weights(weights):
+    table = spawn_sampler.AliasTable([(i, w) for i, w in enumerate(weights)])
+    stat = _chi_square(table, DRAWS, random.Random(1234))
+    assert stat < CHI2_CRITICAL[len(weights) - 1]
+
+
+def test_zero_weight_keys_are_never_drawn():
+    table = spawn_sampler.AliasTable([('a', 0), ('b', 3), ('c', 0), ('d', 1)])
+    rng = random.Random(7)
+    drawn = {table.draw(rng) for _ in range(20000)}
+    assert drawn == {'b', 'd'}
+
+
+def test_degenerate_tables():
+    assert spawn_sampler.AliasTable([]).draw() is None
+    assert spawn_sampler.AliasTable([('a', 0), ('b', 0)]).draw() == 'a'
+
+
+def test_pick_rarity_follows_exclusive_and_global_chances():
+    global_rarities = {
+        '🟢': {'chance': 60.0},
+        '🟣': {'chance': 30.0},
+        '🟡': {'chance': 10.0, 'enabled': False},
+        '💮': {'chance': 10.0},
+    }
+    group_setting = {'rarity_emoji': '💫', 'chance': 20.0}
+    pools = {'🟢', '🟣', '🟡', '💫'}
+    rng = random.Random(99)
+
+    counts = {}
+    for _ in range(DRAWS):
+        emoji, chance, exclusive = spawn_sampler.pick_rarity(-100, pools, global_rarities, group_setting, rng=rng)
+        counts[emoji] = counts.get(emoji, 0) + 1
+
+    # Disabled rarities and rarities without characters are never drawn
+    assert set(counts) == {'💫', '🟢', '🟣'}
+    weights = {'💫': 20.0, '🟢': 60.0, '🟣': 30.0}
+    total = sum(weights.values())
+    stat = sum((counts[e] - DRAWS * w / total) ** 2 / (DRAWS * w / total) for e, w in weights.items())
+    assert stat < CHI2_CRITICAL[2]